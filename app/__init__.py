@@ -1,6 +1,6 @@
 # app/__init__.py
-from flask import Flask
-import os
+from flask import Flask, Response, request, jsonify
+import os, time
 
 def create_app():
     app = Flask(
@@ -8,15 +8,83 @@ def create_app():
         template_folder="templates",
         static_folder="static"
     )
-    app.secret_key = os.urandom(24)
+    # Load .env before anything below imports the modules that read settings.
+    from .config import configure_settings
+    configure_settings(app)
+
+    # A per-process random key breaks sessions as soon as a request lands on
+    # another gunicorn worker, so production must set SECRET_KEY.
+    app.secret_key = os.getenv("SECRET_KEY")
+    if not app.secret_key:
+        print("⚠️ SECRET_KEY is not set; using a random key (sessions won't survive restarts or span workers)")
+        app.secret_key = os.urandom(24)
     app.config['SESSION_PERMANENT'] = False
 
     @app.get("/health")
     def health():
         return "ok", 200
 
+    from .services import metrics
+    metrics.instrument(app)
+    _register_gauges(metrics.registry)
+
+    @app.get("/metrics")
+    def prometheus_metrics():
+        return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+    from .services.openai_client import UpstreamUnavailable
+
+    @app.errorhandler(UpstreamUnavailable)
+    def upstream_unavailable(e):
+        # Browsers navigating to a page get plain text; fetch() callers get JSON.
+        # Calls shed by the governor say when to come back.
+        retry_after = getattr(e, "retry_after", None)
+        headers = {"Retry-After": str(retry_after)} if retry_after else {}
+        if request.accept_mimetypes.best == "text/html":
+            return e.message, 503, headers
+        body = {"error": e.message, **({"retry_after": retry_after} if retry_after else {})}
+        return jsonify(body), 503, headers
+
+    from .services import history_index, catalogue, assets
+    history_index.register_commands(app)
+    catalogue.register_commands(app)
+    assets.register_commands(app)
+    assets.init_app(app)
+    catalogue.catalogue.load()
+
     # Import routes after app is created
     from .routes import init_routes
     init_routes(app)
 
     return app
+
+
+def _register_gauges(registry):
+    """Expose the state of the AI call path's caches and guards at scrape time."""
+    from .services.cache import response_cache
+    from .services.singleflight import flight
+    from .services import openai_client
+    from .services.governor import governor
+    from .services.catalogue import catalogue
+
+    registry.gauge("ai_cache_entries", "Entries in the in-process response cache.",
+                   lambda: {(): response_cache.stats()["entries"]})
+    registry.gauge("ai_inflight_coalesced_keys", "Distinct AI requests currently in flight.",
+                   lambda: {(): flight.stats()["inflight"]})
+    registry.gauge("ai_upstream_slots_in_use", "Upstream concurrency slots currently held.",
+                   lambda: {(): governor.inflight})
+    registry.gauge("ai_governor_queue_depth", "Upstream calls waiting for admission, by priority.",
+                   lambda: {(("priority", p),): n for p, n in governor.stats()["queued"].items()})
+    registry.gauge("ai_governor_oldest_wait_seconds", "How long the oldest queued call has waited, by priority.",
+                   lambda: {(("priority", p),): round(s, 3) for p, s in governor.stats()["oldest_wait"].items()})
+
+    def budgets():
+        stats = governor.stats()
+        return {(("budget", b),): stats[f"{b}_available"] for b in ("requests", "tokens")
+                if stats[f"{b}_available"] is not None}
+    registry.gauge("ai_governor_budget_available", "Requests and tokens left in this worker's per-minute budgets.",
+                   budgets)
+    registry.gauge("catalogue_age_seconds", "Age of the precomputed lesson catalogue being served.",
+                   lambda: {(): round(time.time() - catalogue.manifest["created"])} if catalogue.manifest else {})
+    registry.gauge("ai_circuit_breaker_open", "1 while the OpenAI circuit breaker is rejecting calls.",
+                   lambda: {(): int(openai_client.breaker.state == "open")})
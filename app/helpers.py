@@ -1,24 +1,51 @@
 from flask import request
-from openai import OpenAI
-import os, csv, html as html_module
+import os, time, html as html_module
+from app.services.completions import complete
+from app.services.routing import route, escalation_route
+from app.services.openai_client import call_openai
+from app.services.governor import upstream_slot
+from app.services.metrics import registry, record_upstream
+from app.services.log_writer import get_writer
+from app.services.history_index import index_log
 
 # =========================
-# Configuration
+# Helpers
 # =========================
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-DEFAULT_MODEL  = os.getenv("OPENAI_MODEL", "gpt-4o")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+def ai_chat(messages, site, cache=False):
+    """Small wrapper to call OpenAI chat. site picks the model (see services.routing);
+    cache=True reuses identical answers."""
+    r = route(site)
+    return complete(messages, r.model, r.temperature, cache=cache, max_tokens=r.max_tokens, site=site)
 
-os.makedirs('prompt_log', exist_ok=True)
+def ai_chat_stream(messages, site):
+    """Like ai_chat, but yield text deltas as OpenAI streams them back."""
+    r = route(site)
+    kwargs = {} if r.temperature is None else {"temperature": r.temperature}
+    if r.max_tokens:
+        kwargs["max_tokens"] = r.max_tokens
+    start, usage, first = time.perf_counter(), None, True
+    labels = (("model", r.model),)
+    try:
+        with upstream_slot(site, messages, r.max_tokens) as slot:
+            stream = call_openai(lambda client: client.chat.completions.create(
+                model=r.model, messages=messages, stream=True,
+                stream_options={"include_usage": True}, **kwargs))
+            for chunk in stream:
+                usage = chunk.usage or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first:
+                        registry.observe("ai_first_token_seconds", time.perf_counter() - start, labels)
+                        first = False
+                    yield chunk.choices[0].delta.content
+            slot.settle(usage)
+    except Exception:
+        registry.inc("ai_upstream_errors_total", labels)
+        raise
+    record_upstream(r.model, time.perf_counter() - start, usage, "stream")
 
-# =========================
-# Helpers
-# =========================
-def ai_chat(messages):
-    """Small wrapper to call OpenAI chat."""
-    resp = client.chat.completions.create(model=DEFAULT_MODEL, messages=messages)
-    return resp.choices[0].message.content.strip()
+def wants_stream():
+    """True when the caller asked for a streamed (NDJSON) response."""
+    return "application/x-ndjson" in (request.headers.get("Accept") or "")
 
 def get_data():
     """Merge JSON body and form data safely."""
@@ -27,8 +54,107 @@ def get_data():
         data.setdefault(k, v)
     return {k: (v.strip() if isinstance(v, str) else v) for k, v in data.items()}
 
-def log_prompt_to_csv(task, copilot_prompt, manual_steps):
-    """Log generated prompts to CSV in prompt_log/prompts.csv"""
-    csv_path = os.path.join('prompt_log', 'prompts.csv')
-    with open(csv_path, 'a', newline='', encoding='utf-8') as f:
-        csv.writer(f).writerow([task, copilot_prompt, manual_steps])
+def log_prompt_to_csv(task, copilot_prompt, manual_steps, app_name=""):
+    """Queue a generated prompt for prompt_log/prompts.csv (written in the background)."""
+    get_writer(os.path.join('prompt_log', 'prompts.csv'), on_batch=index_log).write(
+        [task, copilot_prompt, manual_steps, app_name])
+
+# =========================
+# Final output sections
+# =========================
+COPILOT_MARKER = "===COPILOT PROMPT==="
+MANUAL_MARKER  = "===MANUAL STEPS==="
+
+def split_final(text):
+    """Split a finalized reply into (copilot_text, manual_text)."""
+    parts = text.split(MANUAL_MARKER)
+    copilot_text = parts[0].replace(COPILOT_MARKER, "").strip()
+    manual_text = parts[1].strip() if len(parts) > 1 else ""
+    return copilot_text, manual_text
+
+def well_formed_final(text):
+    """True when a final answer has both sections, each with some content."""
+    if COPILOT_MARKER not in text or MANUAL_MARKER not in text:
+        return False
+    copilot_text, manual_text = split_final(text)
+    return bool(copilot_text and manual_text)
+
+def ensure_final_format(messages, reply, site):
+    """Retry a final answer that lost its sections on the strong model.
+
+    Returns the better of the two answers; reply itself when it was fine or
+    escalation is off or impossible.
+    """
+    if well_formed_final(reply):
+        return reply
+    r = escalation_route(site)
+    if r is None:
+        return reply
+    registry.inc("ai_escalations_total", (("site", site), ("model", r.model)))
+    print(f"⤴️ {site} answer was missing its sections; retrying on {r.model}")
+    retry = complete(messages, r.model, r.temperature, max_tokens=r.max_tokens, site="finalize")
+    return retry if well_formed_final(retry) else reply
+
+def clean_steps(text):
+    """Troubleshooter answer -> list of step lines without numbering or markdown."""
+    cleaned = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        line = line.replace("*", "")
+        line = line.lstrip("0123456789).:- ").strip()
+        if line.lower().startswith("no worries"):
+            continue
+        cleaned.append(line)
+    return cleaned
+
+class SectionSplitter:
+    """Route streamed text into 'reply', 'copilot' and 'manual' sections.
+
+    Markers can arrive split across chunks, so a tail that could still grow
+    into a marker is held back until the next chunk (or flush) settles it.
+    """
+    TRANSITIONS = {
+        "reply":   {COPILOT_MARKER: "copilot"},
+        "copilot": {COPILOT_MARKER: "copilot", MANUAL_MARKER: "manual"},
+        "manual":  {},
+    }
+
+    def __init__(self, section="reply"):
+        self.section = section
+        self._buf = ""
+
+    def feed(self, delta):
+        """Add a chunk; return a list of (section, text) ready to emit."""
+        self._buf += delta
+        out = []
+        while True:
+            hits = [(self._buf.find(m), m) for m in self.TRANSITIONS[self.section]]
+            hits = [(i, m) for i, m in hits if i >= 0]
+            if not hits:
+                break
+            idx, marker = min(hits)
+            if idx:
+                out.append((self.section, self._buf[:idx]))
+            self._buf = self._buf[idx + len(marker):]
+            self.section = self.TRANSITIONS[self.section][marker]
+        hold = self._partial_marker_len()
+        ready, self._buf = self._buf[:len(self._buf) - hold], self._buf[len(self._buf) - hold:]
+        if ready:
+            out.append((self.section, ready))
+        return out
+
+    def flush(self):
+        """Emit whatever is still held back at the end of the stream."""
+        rest, self._buf = self._buf, ""
+        return [(self.section, rest)] if rest else []
+
+    def _partial_marker_len(self):
+        longest = 0
+        for marker in self.TRANSITIONS[self.section]:
+            for n in range(min(len(marker) - 1, len(self._buf)), longest, -1):
+                if self._buf.endswith(marker[:n]):
+                    longest = n
+                    break
+        return longest
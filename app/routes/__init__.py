@@ -0,0 +1,9 @@
+"""Every HTTP route, registered once by create_app()."""
+from .main import init_routes as _init_main
+
+
+def init_routes(app):
+    _init_main(app)
+
+    from .assist import bp as assist_bp
+    app.register_blueprint(assist_bp)
@@ -1,24 +1,25 @@
-from flask import Blueprint, request, jsonify
-from ..services.ai import ask_gpt, explain_question_plain
+from flask import Blueprint, request, session, jsonify
+from ..services.ai import ask_gpt, check_messages, explain_question_plain
 from ..services.history import log_prompt_row
 from datetime import datetime
 
 bp = Blueprint("assist", __name__)
 
+@bp.before_request
+def require_login():
+    if not session.get('logged_in'):
+        return jsonify({"error": "Not logged in"}), 403
+
 @bp.route("/ask_gpt", methods=["POST"])
 def ask_gpt_route():
     data = request.get_json(force=True)
     messages = data.get("messages", [])
-    out = ask_gpt(messages)
+    error = check_messages(messages)
+    if error:
+        return jsonify({"error": error}), 400
+    out = ask_gpt([{"role": m["role"], "content": m["content"]} for m in messages])
     return jsonify({"content": out})
 
-@bp.route("/followups/next", methods=["POST"])
-def next_followup():
-    data = request.get_json(force=True)
-    # you likely already have this logic in app.py; move it here.
-    # Return the next question or final result in the same JSON shape as before.
-    return jsonify({"question": "What Microsoft 365 app are you working in?"})
-
 @bp.route("/followups/explain", methods=["POST"])
 def explain_followup():
     data = request.get_json(force=True)
@@ -1,29 +1,423 @@
-from flask import Blueprint, render_template, request, redirect, session, url_for, flash, current_app
-
-bp = Blueprint("main", __name__)
-
-@bp.route("/")
-def index():
-    if session.get("logged_in"):
-        return redirect(url_for("main.home"))
-    return render_template("login.html")
-
-@bp.route("/home")
-def home():
-    if not session.get("logged_in"):
-        return redirect(url_for("main.index"))
-    return render_template("home.html")
-
-@bp.route("/login", methods=["POST"])
-def login():
-    pw = request.form.get("password", "")
-    if pw == current_app.config.get("APP_PASSWORD"):
-        session["logged_in"] = True
-        return redirect(url_for("main.home"))
-    flash("Invalid password")
-    return redirect(url_for("main.index"))
-
-@bp.route("/logout")
-def logout():
-    session.clear()
-    return redirect(url_for("main.index"))
+# app/routes/main.py
+from flask import (render_template, request, redirect, session, url_for, jsonify,
+                   Response, stream_with_context, after_this_request)
+import json, uuid
+from app.services.convo_store import get_store
+from app.services.openai_client import UpstreamUnavailable
+from app.services.context import fit_context
+from app.services.metrics import registry
+from app.services.history_index import get_index
+from app.services.semantic_cache import ask_help_cache
+from app.services.prefetch import prefetcher
+from app.helpers import (
+    ai_chat, ai_chat_stream, get_data, log_prompt_to_csv,
+    wants_stream, split_final, ensure_final_format, clean_steps, SectionSplitter, COPILOT_MARKER,
+)
+from app.services.prompts import lesson_messages, troubleshoot_messages
+from app.services.catalogue import catalogue
+from app.services.ai import explain_questions_batch, EXPLAIN_BATCH_MAX
+from app.services.assets import render_page
+
+def _convo_id():
+    """Return this session's conversation id, allocating one if needed."""
+    cid = session.get('pb_cid')
+    if not cid:
+        cid = session['pb_cid'] = uuid.uuid4().hex
+    return cid
+
+def _fit_context(cid, messages):
+    """Trim/summarize the conversation to the context budget and report the savings."""
+    messages, report = fit_context(cid, messages, lambda m: ai_chat(m, "summarize"))
+    if report:
+        registry.inc("pb_context_tokens_saved_total", amount=max(0, report["tokens_saved"]))
+        print(f"🧮 context {cid[:8]}: {report['tokens_before']} → {report['tokens_after']} tokens "
+              f"(saved {report['tokens_saved']})")
+
+        @after_this_request
+        def add_header(resp):
+            resp.headers["X-Context-Tokens-Saved"] = str(report["tokens_saved"])
+            return resp
+    return messages
+
+def _log_final(copilot_text, manual_text):
+    try:
+        log_prompt_to_csv(copilot_text, copilot_text, manual_text, session.get('pb_app', ''))
+    except Exception as e:
+        print("⚠️ Failed to log prompt:", e)
+
+def _final_payload(final):
+    """Split a finalized reply, log it and build the JSON body."""
+    copilot_text, manual_text = split_final(final)
+    _log_final(copilot_text, manual_text)
+    return {"copilot": copilot_text, "manual": manual_text}
+
+def _explain_question_messages(question):
+    return [
+        {"role": "system", "content": (
+            "You are an assistant explaining to beginners why a specific clarifying question is useful "
+            "for building a better Microsoft Copilot prompt. Keep your explanation simple and supportive."
+        )},
+        {"role": "user", "content": f"Why is this question important? -> {question}"}
+    ]
+
+def _question_payload(cid, question):
+    """Return a clarifying question, prefetching its explanation in the background."""
+    prefetcher.submit(cid, question, lambda: ai_chat(_explain_question_messages(question), "explain", cache=True))
+    return {"reply": question}
+
+def _reply_payload(cid, reply):
+    """Detect if the model finalized inside the chat."""
+    if COPILOT_MARKER in reply:
+        return {"finalized": True, **_final_payload(reply)}
+    return _question_payload(cid, reply)
+
+def _stream_reply(cid, messages, new_turn, section, payload, site):
+    """Stream a completion as NDJSON events.
+
+    Each line is {"section", "delta"} while tokens arrive, then one
+    {"done": true, ...payload(reply)} line carrying the same fields the
+    non-streaming endpoint would have returned. The new user turn and the
+    reply are saved to the conversation store once the stream completes.
+    A final answer that streamed without its sections is escalated before
+    the done line, which then carries the corrected sections.
+    """
+
+    def events():
+        splitter = SectionSplitter(section)
+        parts = []
+        try:
+            for delta in ai_chat_stream(messages, site):
+                parts.append(delta)
+                for sec, text in splitter.feed(delta):
+                    yield {"section": sec, "delta": text}
+            for sec, text in splitter.flush():
+                yield {"section": sec, "delta": text}
+        except UpstreamUnavailable as e:
+            retry_after = getattr(e, "retry_after", None)   # set when the governor shed the call
+            yield {"done": True, "error": e.message, **({"retry_after": retry_after} if retry_after else {})}
+            return
+        except Exception as e:
+            print("⚠️ Stream failed:", e)
+            yield {"done": True, "error": "The AI service did not respond. Please try again."}
+            return
+        reply = "".join(parts).strip()
+        if section == "copilot" or COPILOT_MARKER in reply:
+            try:
+                reply = ensure_final_format(messages, reply, site)
+            except Exception as e:
+                print("⚠️ Escalation failed:", e)
+        get_store().append(cid, new_turn, {"role": "assistant", "content": reply})
+        yield {"done": True, **payload(reply)}
+
+    body = stream_with_context(json.dumps(e) + "\n" for e in events())
+    return Response(body, mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def init_routes(app):
+    # =========================
+    # Auth & Home
+    # =========================
+    @app.route('/', methods=['GET', 'POST'])
+    def login():
+        if session.get('logged_in'):
+            return redirect(url_for('home'))
+        error = None
+        if request.method == 'POST':
+            if (request.form.get('password') or '').strip() == (app.config.get('APP_PASSWORD') or ''):
+                session['logged_in'] = True
+                session['uid'] = uuid.uuid4().hex   # fair-share key for the upstream governor
+                # reset conversation state for prompt builder
+                session.pop('pb_cid', None)
+                session['pb_clarifications'] = 0
+                return redirect(url_for('home'))
+            error = "Invalid password"
+            return render_template('login.html', error=error)
+        return render_page('login.html')
+
+    @app.route('/logout')
+    def logout():
+        if session.get('pb_cid'):
+            get_store().delete(session['pb_cid'])
+            prefetcher.discard(session['pb_cid'])
+        session.clear()
+        return redirect(url_for('login'))
+
+    @app.route('/home')
+    def home():
+        if not session.get('logged_in'):
+            return redirect(url_for('login'))
+        return render_page('home.html')
+
+    # =========================
+    # Prompt Builder
+    # =========================
+    @app.route('/prompt_builder')
+    def prompt_builder():
+        if not session.get('logged_in'):
+            return redirect(url_for('login'))
+        return render_page('prompt_builder.html')
+
+    @app.route('/pb_start', methods=['POST'])
+    def pb_start():
+        """Start a new prompt builder session."""
+        if not session.get('logged_in'):
+            return jsonify({"error": "Not logged in"}), 403
+
+        data = get_data()
+        app_choice = (data.get("app") or "").strip()
+        goal = (data.get("goal") or "").strip()
+
+        if not app_choice or not goal:
+            return jsonify({"error": "Missing app or goal"}), 400
+
+        # reset conversation
+        cid = _convo_id()
+        system = [
+            {"role": "system", "content": (
+                "You are an assistant that helps build perfect Microsoft Copilot prompts. "
+                "Ask smart, beginner-friendly follow-up questions in plain language (like a 'for dummies' guide). "
+                "Keep them clear and simple. Do NOT finalize until explicitly asked. "
+                "When finalizing, output exactly two sections:\n\n"
+                "===COPILOT PROMPT===\nFinal Copilot prompt.\n\n"
+                "===MANUAL STEPS===\nStep-by-step beginner instructions."
+            )}
+        ]
+        first_turn = {"role": "user", "content": f"App: {app_choice}\nGoal: {goal}"}
+        get_store().reset(cid, system)
+        session['pb_clarifications'] = 1
+        session['pb_app'] = app_choice
+
+        if wants_stream():
+            return _stream_reply(cid, system + [first_turn], first_turn, "reply",
+                                 lambda reply: _question_payload(cid, reply), "clarify")
+
+        reply = ai_chat(system + [first_turn], "clarify")
+        get_store().append(cid, first_turn, {"role": "assistant", "content": reply})
+
+        return jsonify(_question_payload(cid, reply))
+
+    @app.route('/pb_reply', methods=['POST'])
+    def pb_reply():
+        """Handle user reply or detect final output inline."""
+        if not session.get('logged_in'):
+            return jsonify({"error": "Not logged in"}), 403
+
+        data = get_data()
+        user_reply = (data.get("message") or "").strip()
+
+        if not user_reply:
+            return jsonify({"error": "Missing message"}), 400
+
+        cid = _convo_id()
+        convo = get_store().get(cid)
+        turn = {"role": "user", "content": user_reply}
+        session['pb_clarifications'] = session.get('pb_clarifications', 0) + 1
+
+        messages = _fit_context(cid, convo + [turn])
+
+        if wants_stream():
+            return _stream_reply(cid, messages, turn, "reply", lambda reply: _reply_payload(cid, reply), "clarify")
+
+        reply = ai_chat(messages, "clarify")
+        if COPILOT_MARKER in reply:
+            reply = ensure_final_format(messages, reply, "clarify")
+        get_store().append(cid, turn, {"role": "assistant", "content": reply})
+
+        return jsonify(_reply_payload(cid, reply))
+
+    @app.route('/pb_finalize', methods=['POST'])
+    def pb_finalize():
+        """Generate the final Copilot prompt and manual instructions."""
+        if not session.get('logged_in'):
+            return jsonify({"error": "Not logged in"}), 403
+
+        cid = _convo_id()
+        convo = get_store().get(cid)
+        turn = {
+            "role": "user",
+            "content": (
+                "Finalize now. IMPORTANT: Provide output in exactly two sections:\n\n"
+                "===COPILOT PROMPT===\nOnly the Copilot prompt.\n\n"
+                "===MANUAL STEPS===\nOnly manual beginner steps."
+            )
+        }
+
+        messages = _fit_context(cid, convo + [turn])
+
+        if wants_stream():
+            return _stream_reply(cid, messages, turn, "copilot", _final_payload, "finalize")
+
+        final = ensure_final_format(messages, ai_chat(messages, "finalize"), "finalize")
+        get_store().append(cid, turn, {"role": "assistant", "content": final})
+
+        return jsonify(_final_payload(final))
+
+    # =========================
+    # Explain Prompt / Explain Question
+    # =========================
+    @app.route('/explain_prompt', methods=['POST'])
+    def explain_prompt():
+        """Explain the FINAL Copilot prompt in beginner-friendly terms."""
+        if not session.get('logged_in'):
+            return jsonify({"error": "Not logged in"}), 403
+
+        data = get_data()
+        prompt_text = (data.get("prompt") or "").strip()
+        if not prompt_text:
+            return jsonify({"explanation": "No prompt provided to explain."})
+
+        convo = [
+            {"role": "system", "content": (
+                "You explain Microsoft Copilot prompts to beginners. "
+                "Write a short, friendly explanation that covers:\n"
+                "1) What this prompt will make Copilot do\n"
+                "2) What info it assumes / needs\n"
+                "3) Any data-safety or privacy cautions for a workplace\n"
+                "4) 2–3 optional tweaks to improve the prompt\n"
+                "Use plain language and short bullet points."
+            )},
+            {"role": "user", "content": f"Explain this Copilot prompt:\n{prompt_text}"}
+        ]
+        explanation = ai_chat(convo, "explain", cache=True)
+        return jsonify({"explanation": explanation})
+
+    @app.route('/explain_question', methods=['POST'])
+    def explain_question():
+        """Explain why AI asked a clarifying question."""
+        if not session.get('logged_in'):
+            return jsonify({"error": "Not logged in"}), 403
+
+        data = get_data()
+        question = (data.get("question") or "").strip()
+        if not question:
+            return jsonify({"explanation": "This follow-up is asking for more detail so the prompt is precise."})
+
+        explanation = prefetcher.take(session.get('pb_cid'), question)
+        if explanation is None:
+            explanation = ai_chat(_explain_question_messages(question), "explain", cache=True)
+        return jsonify({"explanation": explanation})
+
+    @app.route('/followups/explain_batch', methods=['POST'])
+    def explain_followups():
+        """Explain several pending follow-up questions in one round trip.
+
+        Body: {"app_context": "Word", "questions": ["...", {"question_text": "...", "app_context": "..."}]}
+        """
+        if not session.get('logged_in'):
+            return jsonify({"error": "Not logged in"}), 403
+
+        data = get_data()
+        default_label = data.get("app_context") or "General"
+        questions = data.get("questions") or []
+        if not isinstance(questions, list) or not questions:
+            return jsonify({"error": "questions must be a non-empty list"}), 400
+        if len(questions) > EXPLAIN_BATCH_MAX:
+            return jsonify({"error": f"At most {EXPLAIN_BATCH_MAX} questions per request"}), 400
+        items = []
+        for q in questions:
+            if isinstance(q, dict):
+                items.append((str(q.get("question_text", "")), q.get("app_context") or default_label))
+            else:
+                items.append((str(q), default_label))
+        results = explain_questions_batch(items)
+        return jsonify({
+            "results": [{"question_text": q, **res} for (q, _), res in zip(items, results)],
+            "note": "You can skip any question if you are unsure."
+        })
+
+    # =========================
+    # Help / Tools Pages
+    # =========================
+    @app.route('/help')
+    def help():
+        """General Help page (overview + quick AI Q&A)."""
+        if not session.get('logged_in'):
+            return redirect(url_for('login'))
+        return render_page('help.html')
+
+    @app.route('/ask_help', methods=['GET', 'POST'])
+    def ask_help():
+        """AI Troubleshooter page."""
+        if not session.get('logged_in'):
+            return redirect(url_for('login'))
+        if request.method == 'GET':
+            return render_page('ask_help.html')
+
+        app_selected = ""
+        problem = ""
+        steps = None
+
+        if request.method == 'POST':
+            app_selected = (request.form.get("app") or "").strip()
+            problem = (request.form.get("problem") or "").strip()
+
+            if not app_selected or not problem:
+                steps = ["Please select an app and describe the problem."]
+            else:
+                steps, similarity = ask_help_cache.lookup(app_selected, problem)
+                if steps is not None:
+                    @after_this_request
+                    def add_header(resp):
+                        resp.headers["X-Answer-Reused"] = f"{similarity:.2f}"
+                        return resp
+
+            if steps is None and app_selected and problem:
+                steps = clean_steps(ai_chat(troubleshoot_messages(app_selected, problem), "troubleshoot"))
+                ask_help_cache.add(app_selected, problem, steps)
+
+        return render_template(
+            'ask_help.html',
+            app_selected=app_selected,
+            problem=problem,
+            steps=steps
+        )
+
+    @app.route('/troubleshooter')
+    def troubleshooter():
+        if not session.get('logged_in'):
+            return redirect(url_for('login'))
+        return render_page('troubleshooter.html')
+
+    @app.route('/teach_me', methods=['GET', 'POST'])
+    def teach_me():
+        if not session.get('logged_in'):
+            return redirect(url_for('login'))
+        if request.method == 'GET':
+            return render_page('teach_me.html')
+
+        lesson = None
+        if request.method == 'POST':
+            app_choice = (request.form.get("app") or "").strip()
+            if app_choice:
+                lesson = catalogue.lesson(app_choice) or ai_chat(lesson_messages(app_choice), "teach", cache=True)
+
+        return render_template('teach_me.html', lesson=lesson)
+
+    # =========================
+    # Prompt History
+    # =========================
+    @app.route('/history/search')
+    def history_search():
+        """Paginated search of saved prompts: ?q=&app=&since=&until=&sort=&page=&per_page="""
+        if not session.get('logged_in'):
+            return jsonify({"error": "Not logged in"}), 403
+        args = request.args
+        try:
+            page = int(args.get("page", 1))
+            per_page = int(args.get("per_page", 20))
+        except ValueError:
+            return jsonify({"error": "page and per_page must be integers"}), 400
+        return jsonify(get_index().search(
+            q=args.get("q", ""), app=args.get("app", ""),
+            since=args.get("since", ""), until=args.get("until", ""),
+            page=page, per_page=per_page, sort=args.get("sort", ""),
+        ))
+
+    @app.route('/history/<int:prompt_id>')
+    def history_item(prompt_id):
+        if not session.get('logged_in'):
+            return jsonify({"error": "Not logged in"}), 403
+        item = get_index().get(prompt_id)
+        if item is None:
+            return jsonify({"error": "Not found"}), 404
+        return jsonify(item)
@@ -1,26 +1,43 @@
-from openai import OpenAI
-from flask import current_app
+import json, os
+from concurrent.futures import ThreadPoolExecutor
+from .cache import response_cache, cache_key
+from .completions import complete
+from .governor import governor, request_session_key
+from .routing import route
 
-def _client():
-    api_key = current_app.config["OPENAI_API_KEY"]
-    return OpenAI(api_key=api_key)
+EXPLAIN_BATCH_MAX        = int(os.getenv("EXPLAIN_BATCH_MAX", "8"))          # questions per request
+EXPLAIN_BATCH_PACK_CHARS = int(os.getenv("EXPLAIN_BATCH_PACK_CHARS", "4000"))  # larger batches fan out instead
+ASSIST_MAX_MESSAGES      = int(os.getenv("ASSIST_MAX_MESSAGES", "20"))         # per /ask_gpt request
+ASSIST_MAX_CHARS         = int(os.getenv("ASSIST_MAX_CHARS", "12000"))         # total content, roughly 3k tokens
 
-def ask_gpt(messages, model=None):
-    client = _client()
-    mdl = model or current_app.config["DEFAULT_MODEL"]
-    resp = client.chat.completions.create(model=mdl, messages=messages, temperature=0.3)
-    return resp.choices[0].message.content.strip()
+_fanout = None
 
-def explain_question_plain(question_text, app_context_label):
-    """Return a for-dummies style explanation of the follow-up question."""
-    system = {
-        "role": "system",
-        "content": (
-            "You are a patient Microsoft 365 coach for TVA employees. "
-            "Explain the question in simple, friendly terms. "
-            "Give 1–2 short examples. End with a note that the user can skip."
-        )
-    }
+def ask_gpt(messages, model=None, cache=False, site="assist"):
+    r = route(site)
+    return complete(messages, model or r.model, r.temperature, cache=cache, max_tokens=r.max_tokens, site=site)
+
+def check_messages(messages):
+    """Return why a client-supplied message list can't be sent upstream, or None if it can."""
+    if not isinstance(messages, list) or not messages:
+        return "messages must be a non-empty list"
+    if len(messages) > ASSIST_MAX_MESSAGES:
+        return f"At most {ASSIST_MAX_MESSAGES} messages per request"
+    for m in messages:
+        if not isinstance(m, dict) or m.get("role") not in ("system", "user", "assistant") \
+                or not isinstance(m.get("content"), str):
+            return "Each message needs a role (system, user or assistant) and text content"
+    if sum(len(m["content"]) for m in messages) > ASSIST_MAX_CHARS:
+        return f"Messages are too long (at most {ASSIST_MAX_CHARS} characters in total)"
+    return None
+
+_COACH = (
+    "You are a patient Microsoft 365 coach for TVA employees. "
+    "Explain the question in simple, friendly terms. "
+    "Give 1–2 short examples. End with a note that the user can skip."
+)
+
+def _plain_messages(question_text, app_context_label):
+    system = {"role": "system", "content": _COACH}
     user = {
         "role": "user",
         "content": (
@@ -29,4 +46,91 @@ def explain_question_plain(question_text, app_context_label):
             "Write in plain language, short sentences."
         )
     }
-    return ask_gpt([system, user])
+    return [system, user]
+
+def explain_question_plain(question_text, app_context_label):
+    """Return a for-dummies style explanation of the follow-up question."""
+    return ask_gpt(_plain_messages(question_text, app_context_label), cache=True, site="explain")
+
+
+def explain_questions_batch(items):
+    """Explain several follow-up questions; returns one dict per item, in order.
+
+    items are (question_text, app_context_label) pairs. Answers already in
+    the response cache are used as-is; the rest are packed into a single
+    completion that returns a JSON list. If the batch is too large to pack,
+    or the packed answer cannot be matched up, the remaining questions fan
+    out as concurrent single calls. Each result is {"explanation": ...} or
+    {"error": ...}, so one failed question does not fail the batch.
+    """
+    r = route("explain")
+    results = [None] * len(items)
+    pending = []
+    for i, (question, label) in enumerate(items):
+        if not question.strip():
+            results[i] = {"error": "No question provided to explain."}
+            continue
+        cached = response_cache.get(cache_key(r.model, r.temperature, _plain_messages(question, label), r.max_tokens))
+        if cached is not None:
+            results[i] = {"explanation": cached}
+        else:
+            pending.append(i)
+
+    packable = len(pending) > 1 and sum(len(items[i][0]) for i in pending) <= EXPLAIN_BATCH_PACK_CHARS
+    if packable:
+        try:
+            packed = _explain_packed([items[i] for i in pending])
+        except Exception as e:
+            print("⚠️ Packed explanation failed, fanning out:", e)
+            packed = None
+        if packed:
+            for i, text in zip(pending, packed):
+                results[i] = {"explanation": text}
+                # Later single-question calls for the same question reuse this answer.
+                response_cache.set(cache_key(r.model, r.temperature, _plain_messages(*items[i]), r.max_tokens), text)
+            pending = []
+
+    if pending:
+        key = request_session_key()   # pool threads have no request to take it from
+        futures = {i: _pool().submit(_explain_for, key, *items[i]) for i in pending}
+        for i, future in futures.items():
+            try:
+                results[i] = {"explanation": future.result()}
+            except Exception as e:
+                print(f"⚠️ Explaining question {i} failed:", e)
+                results[i] = {"error": getattr(e, "message", None) or "Could not explain this question. Please try again."}
+    return results
+
+def _explain_for(session_key, question, label):
+    with governor.acting_for(session_key):
+        return explain_question_plain(question, label)
+
+def _explain_packed(items):
+    """One completion for all items; returns their explanations, or None if the reply doesn't fit."""
+    numbered = "\n\n".join(
+        f"{n}. App context: {label}\n   Follow-up question to explain: {question}"
+        for n, (question, label) in enumerate(items, 1))
+    messages = [
+        {"role": "system", "content": _COACH + (
+            " You will be given several numbered questions. Reply with only a JSON object of the form "
+            '{"explanations": ["...", "..."]}, one plain-language explanation per question, in the same order.'
+        )},
+        {"role": "user", "content": numbered},
+    ]
+    r = route("explain")
+    max_tokens = r.max_tokens * len(items) if r.max_tokens else None
+    text = complete(messages, r.model, r.temperature, cache=True, max_tokens=max_tokens, site="explain")
+    text = text.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+    try:
+        explanations = json.loads(text)["explanations"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if len(explanations) != len(items) or not all(isinstance(e, str) and e.strip() for e in explanations):
+        return None
+    return [e.strip() for e in explanations]
+
+def _pool():
+    global _fanout
+    if _fanout is None:
+        _fanout = ThreadPoolExecutor(EXPLAIN_BATCH_MAX, thread_name_prefix="explain-fanout")
+    return _fanout
@@ -0,0 +1,262 @@
+"""Fingerprinted, precompressed static assets and cacheable pages.
+
+create_app() calls init_app(), which makes sure ASSETS_DIR (prompt_log/assets
+under the working directory, like the other runtime data, so the package
+tree is never written to) holds a build of app/static matching the files
+on disk (building one under a file lock when it doesn't) and gives
+templates asset_url():
+
+    {{ asset_url('css/home.css') }}   ->   /assets/css/home.3f9a0c1d2e.css
+
+Built names carry a hash of their content, so /assets responses are cached
+for a year as immutable and a changed file simply gets a new URL. Text
+assets get .gz (and, with the brotli package installed, .br) variants that
+are sent to browsers which accept them, and url(...) references in CSS are
+rewritten to the hashed names. Without a usable build (ASSETS_BUILD=0 and
+nothing built yet, or a build that failed) asset_url() falls back to /static.
+
+render_page() serves templates that are the same for every user: the HTML
+is rendered and compressed once per process and sent with an ETag, so
+browsers revalidate with a 304 instead of downloading the page again.
+`flask assets-build` builds ahead of time, e.g. in a deploy image.
+"""
+import gzip, hashlib, json, mimetypes, os, posixpath, re, threading, time
+from flask import Response, abort, current_app, render_template, request, send_file, url_for
+from werkzeug.security import safe_join
+from app.services.log_writer import file_lock
+
+try:
+    import brotli
+except ImportError:   # gzip only
+    brotli = None
+
+STATIC_DIR          = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+ASSETS_DIR          = os.getenv("ASSETS_DIR", os.path.join("prompt_log", "assets"))
+ASSETS_BUILD        = os.getenv("ASSETS_BUILD", "1") == "1"          # build at startup when static/ changed
+ASSETS_MAX_AGE      = int(os.getenv("ASSETS_MAX_AGE", str(365 * 86400)))
+ASSETS_KEEP_SECONDS = int(os.getenv("ASSETS_KEEP_SECONDS", "86400"))  # how long replaced files stay servable
+
+_BUILD_FORMAT = 1   # bump when build() output changes, so existing builds are redone
+_COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+?)\1\s*\)""")
+
+
+def _sources(static_dir, out_dir):
+    """Relative paths of every file under static_dir except the build output."""
+    out_dir = os.path.abspath(out_dir)
+    names = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != out_dir and not d.startswith(".")]
+        for f in files:
+            if not f.startswith("."):
+                names.append(os.path.relpath(os.path.join(root, f), static_dir).replace(os.sep, "/"))
+    return sorted(names)
+
+def fingerprint(static_dir=STATIC_DIR, out_dir=ASSETS_DIR):
+    """Hash of every source file; a build whose fingerprint differs is out of date."""
+    h = hashlib.sha256(f"{_BUILD_FORMAT}:{bool(brotli)}".encode())   # installing brotli adds .br files
+    for name in _sources(static_dir, out_dir):
+        with open(os.path.join(static_dir, name), "rb") as f:
+            h.update(name.encode("utf-8") + b"\0" + f.read() + b"\0")
+    return h.hexdigest()[:16]
+
+
+def build(static_dir=STATIC_DIR, out_dir=ASSETS_DIR, log=print):
+    """Write hashed, compressed copies of static_dir into out_dir and a manifest; returns the manifest."""
+    start = time.perf_counter()
+    files = {}
+    # CSS last, so its url() references can be pointed at the hashed images
+    for name in sorted(_sources(static_dir, out_dir), key=lambda n: (n.endswith(".css"), n)):
+        with open(os.path.join(static_dir, name), "rb") as f:
+            data = f.read()
+        if name.endswith(".css"):
+            data = _rewrite_css(name, data.decode("utf-8"), files).encode("utf-8")
+        stem, ext = posixpath.splitext(name)
+        files[name] = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+        _write_variants(os.path.join(out_dir, files[name]), data, best=True)
+
+    manifest = {"fingerprint": fingerprint(static_dir, out_dir), "created": time.time(), "files": files}
+    _write_atomic(os.path.join(out_dir, "manifest.json"), json.dumps(manifest, indent=1).encode("utf-8"))
+    _prune(out_dir, set(files.values()))
+    log(f"🎨 assets {manifest['fingerprint']}: {len(files)} files in {(time.perf_counter() - start) * 1000:.0f} ms"
+        f"{'' if brotli else ' (gzip only, brotli not installed)'}")
+    return manifest
+
+
+def _rewrite_css(name, text, files):
+    base = posixpath.dirname(name)
+
+    def hashed(m):
+        quote, ref = m.group(1), m.group(2).strip()
+        if ref.startswith(("data:", "http:", "https:", "//", "#")):
+            return m.group(0)
+        path, suffix = re.match(r"([^?#]*)(.*)", ref).groups()
+        target = path[len("/static/"):] if path.startswith("/static/") else posixpath.normpath(posixpath.join(base, path))
+        if target not in files:
+            return m.group(0)
+        return f"url({quote}{posixpath.relpath(files[target], base or '.')}{suffix}{quote})"
+
+    return _CSS_URL.sub(hashed, text)
+
+def _compressed(data, best=False):
+    """{encoding: bytes} for the encodings that actually make data smaller."""
+    out = {}
+    gz = gzip.compress(data, 9 if best else 6, mtime=0)
+    if len(gz) < len(data):
+        out["gzip"] = gz
+    if brotli:
+        br = brotli.compress(data, quality=11 if best else 5)
+        if len(br) < len(data):
+            out["br"] = br
+    return out
+
+def _write_variants(path, data, best=False):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):   # content-addressed: same name, same bytes
+        _write_atomic(path, data)
+    if os.path.splitext(path)[1] not in _COMPRESSIBLE or len(data) < 256:
+        return
+    missing = [(e, suffix) for e, suffix in _ENCODINGS if not os.path.exists(path + suffix)]
+    if missing:
+        variants = _compressed(data, best)
+        for encoding, suffix in missing:
+            if encoding in variants:
+                _write_atomic(path + suffix, variants[encoding])
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _prune(out_dir, keep):
+    """Delete files dropped from the manifest once pages that referenced them have aged out."""
+    cutoff = time.time() - ASSETS_KEEP_SECONDS
+    for root, _, files in os.walk(out_dir):
+        for f in files:
+            path = os.path.join(root, f)
+            name = os.path.relpath(path, out_dir).replace(os.sep, "/")
+            base = name[:-3] if name.endswith((".gz", ".br")) else name
+            if base.startswith("manifest.json") or base in keep:
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+class Assets:
+    """The build being served by this process, plus its rendered-page cache."""
+
+    def __init__(self, static_dir=STATIC_DIR, out_dir=ASSETS_DIR):
+        self.static_dir = static_dir
+        self.out_dir = out_dir
+        self.files = {}    # logical name -> hashed name; empty = serve /static as-is
+        self._pages = {}   # template -> (etag, {encoding: body})
+        self._lock = threading.Lock()
+
+    def load(self, build_missing=ASSETS_BUILD):
+        """Use the build in out_dir if it matches static_dir, building it first if allowed."""
+        current = fingerprint(self.static_dir, self.out_dir)
+        manifest = self._manifest()
+        if build_missing and (manifest or {}).get("fingerprint") != current:
+            try:
+                with file_lock(os.path.join(self.out_dir, "manifest.json")):
+                    manifest = self._manifest()   # another worker may have just built it
+                    if (manifest or {}).get("fingerprint") != current:
+                        manifest = build(self.static_dir, self.out_dir)
+            except OSError as e:
+                print("⚠️ Could not build static assets, serving /static unhashed:", e)
+        if (manifest or {}).get("fingerprint") == current:
+            self.files = manifest["files"]
+        else:
+            self.files = {}
+        self._pages.clear()
+        return bool(self.files)
+
+    def url(self, name):
+        hashed = self.files.get(name)
+        if hashed:
+            return url_for("asset", filename=hashed)
+        return url_for("static", filename=name)
+
+    def send(self, filename):
+        """Serve a built file, precompressed when the client accepts it."""
+        if filename.startswith("manifest.json") or filename.endswith((".gz", ".br", ".lock", ".tmp")):
+            abort(404)
+        # ASSETS_DIR is relative to the working directory; send_file would resolve it against the app.
+        path = safe_join(os.path.abspath(self.out_dir), filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        encoding = _accepted([e for e, suffix in _ENCODINGS if os.path.isfile(path + suffix)])
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        resp = send_file(path + dict(_ENCODINGS).get(encoding, ""), mimetype=mimetype,
+                         max_age=ASSETS_MAX_AGE, conditional=True)
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        resp.vary.add("Accept-Encoding")
+        resp.cache_control.public = True
+        resp.cache_control.immutable = True
+        return resp
+
+    def render_page(self, template):
+        """Render a template that has no per-user content, with an ETag and a compressed copy."""
+        page = self._pages.get(template)
+        if page is None:
+            html = render_template(template).encode("utf-8")
+            page = (hashlib.sha256(html).hexdigest()[:20], dict(_compressed(html), identity=html))
+            if not current_app.debug:   # keep template edits visible while developing
+                with self._lock:
+                    self._pages[template] = page
+        etag, bodies = page
+        encoding = _accepted([e for e in bodies if e != "identity"])
+        resp = Response(bodies[encoding or "identity"], mimetype="text/html")
+        resp.set_etag(f"{etag}-{encoding}" if encoding else etag)
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        resp.vary.add("Accept-Encoding")
+        resp.cache_control.private = True   # browsers only, never shared caches
+        resp.cache_control.no_cache = True
+        return resp.make_conditional(request)
+
+    def _manifest(self):
+        try:
+            with open(os.path.join(self.out_dir, "manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def _accepted(available):
+    """The best of the available encodings the client accepts, or None for identity."""
+    for encoding, _ in _ENCODINGS:
+        if encoding in available and request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+assets = Assets()
+
+def asset_url(name):
+    return assets.url(name)
+
+def render_page(template):
+    return assets.render_page(template)
+
+
+def init_app(app):
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.add_url_rule("/assets/<path:filename>", "asset", assets.send)
+    assets.load()
+
+
+def register_commands(app):
+    import click
+
+    @app.cli.command("assets-build")
+    def assets_build():
+        """Fingerprint and precompress app/static into ASSETS_DIR."""
+        with file_lock(os.path.join(assets.out_dir, "manifest.json")):
+            build(assets.static_dir, assets.out_dir, log=click.echo)
@@ -0,0 +1,39 @@
+"""Keep blocking file and SQLite work off the gevent hub.
+
+Under gunicorn's gevent workers monkey.patch_all() makes sockets, sleeps
+and locks cooperative, but sqlite3 (including the busy-timeout wait for
+another writer), fcntl.flock and plain file reads and writes still block
+the whole worker while they run. offload() hands such a call to gevent's
+native threadpool and parks only the calling greenlet until it finishes.
+In a sync or gthread worker, a CLI command or a test it just calls fn.
+"""
+import functools, sys, threading
+
+_local = threading.local()   # set inside a pool thread, so nested calls run inline
+
+
+def _gevent_patched():
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("threading")
+
+def offload(fn, *args, **kwargs):
+    """Return fn(*args, **kwargs), run on gevent's threadpool when threading is patched."""
+    if getattr(_local, "active", False) or not _gevent_patched():
+        return fn(*args, **kwargs)
+    import gevent
+    return gevent.get_hub().threadpool.apply(_run, (fn, args, kwargs))
+
+def _run(fn, args, kwargs):
+    _local.active = True
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _local.active = False
+
+
+def blocking(fn):
+    """Decorator: always call fn through offload()."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return offload(fn, *args, **kwargs)
+    return wrapper
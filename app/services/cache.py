@@ -0,0 +1,114 @@
+"""Response cache for AI calls whose answer only depends on the request.
+
+Entries are keyed by a hash of (model, temperature, messages). A bounded
+in-process LRU sits in front of an optional SQLite file (AI_CACHE_DB) so
+that several gunicorn workers can share answers.
+"""
+import os, json, hashlib, sqlite3, threading, time
+from collections import OrderedDict
+from app.services.blocking import blocking
+
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "512"))     # entries kept in memory
+AI_CACHE_TTL  = int(os.getenv("AI_CACHE_TTL", "86400"))    # seconds
+AI_CACHE_DB   = os.getenv("AI_CACHE_DB", "")               # e.g. prompt_log/ai_cache.db
+
+
+def cache_key(model, temperature, messages, max_tokens=None):
+    """Stable hash of everything that determines a completion."""
+    params = [model, temperature, messages] + ([max_tokens] if max_tokens else [])
+    blob = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded LRU with TTL, optionally backed by a shared SQLite file."""
+
+    def __init__(self, size=AI_CACHE_SIZE, ttl=AI_CACHE_TTL, path=AI_CACHE_DB):
+        self.size = size
+        self.ttl = ttl
+        self.path = path or None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (stored_at, text)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def get(self, key):
+        """Return the cached text for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+
+        entry = self._disk_get(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return entry[1]
+
+    def set(self, key, text):
+        entry = (time.time(), text)
+        with self._lock:
+            self._remember(key, entry)
+        self._disk_set(key, entry)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    # ---- optional shared backend ----
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, text TEXT NOT NULL)"
+            )
+            self._local.db = db
+        return db
+
+    @blocking
+    def _disk_get(self, key, now):
+        if not self.path:
+            return None
+        try:
+            row = self._db().execute(
+                "SELECT stored_at, text FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print("⚠️ AI cache read failed:", e)
+            return None
+        if row is None or now - row[0] > self.ttl:
+            return None
+        return row
+
+    @blocking
+    def _disk_set(self, key, entry):
+        if not self.path:
+            return
+        try:
+            self._db().execute(
+                "INSERT OR REPLACE INTO responses (key, stored_at, text) VALUES (?, ?, ?)",
+                (key, entry[0], entry[1]),
+            )
+        except sqlite3.Error as e:
+            print("⚠️ AI cache write failed:", e)
+
+
+response_cache = ResponseCache()
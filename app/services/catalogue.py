@@ -0,0 +1,277 @@
+"""Precomputed Teach Me lessons and Troubleshooter guides for the app menu.
+
+`flask catalogue-build` generates a lesson and a set of common-issue guides
+for every app in APPS, in parallel under a requests-per-minute limit, and
+writes them as a new version directory:
+
+    CATALOGUE_DIR/<version>/manifest.json
+    CATALOGUE_DIR/<version>/<App>.json      {"lesson": ..., "issues": [{"problem", "steps"}]}
+    CATALOGUE_DIR/current                   name of the version being served
+
+The pointer is switched atomically once a build finishes, and the last
+CATALOGUE_KEEP versions are kept. create_app() loads the current version,
+so /teach_me serves menu lessons from memory and the common issues seed
+the Troubleshooter's similar-answer cache.
+
+A version older than CATALOGUE_MAX_AGE, or built from different prompts or
+models than the running code would use, is stale. Stale content is still
+served; with CATALOGUE_REFRESH=1 one process (chosen by a file lock)
+rebuilds it in the background and every worker picks up the new version
+within CATALOGUE_RELOAD_INTERVAL seconds.
+"""
+import hashlib, json, os, shutil, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from app.services.log_writer import fcntl
+from app.services.prompts import lesson_messages, troubleshoot_messages, common_issues_messages
+from app.services.routing import route
+from app.services.governor import governor
+
+APPS = ["Word", "Excel", "Outlook", "Teams", "PowerPoint"]   # the Teach Me / Troubleshooter menus
+
+CATALOGUE_DIR             = os.getenv("CATALOGUE_DIR", os.path.join("prompt_log", "catalogue"))
+CATALOGUE_MAX_AGE         = int(os.getenv("CATALOGUE_MAX_AGE", str(7 * 86400)))   # seconds
+CATALOGUE_REFRESH         = os.getenv("CATALOGUE_REFRESH", "0") == "1"           # rebuild stale versions in the background
+CATALOGUE_RELOAD_INTERVAL = int(os.getenv("CATALOGUE_RELOAD_INTERVAL", "60"))
+CATALOGUE_KEEP            = int(os.getenv("CATALOGUE_KEEP", "3"))
+CATALOGUE_ISSUES          = int(os.getenv("CATALOGUE_ISSUES", "8"))              # common issues per app
+CATALOGUE_WORKERS         = int(os.getenv("CATALOGUE_WORKERS", "4"))
+CATALOGUE_RPM             = float(os.getenv("CATALOGUE_RPM", "60"))              # upstream calls per minute
+
+
+def fingerprint():
+    """Hash of the prompts and routes a build would use; a change makes a version stale."""
+    parts = [lesson_messages("{app}"), troubleshoot_messages("{app}", "{problem}"),
+             common_issues_messages("{app}", CATALOGUE_ISSUES),
+             route("teach"), route("troubleshoot"), APPS]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class RateLimiter:
+    """Space calls evenly so no more than per_minute start in any minute."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def build(apps=None, workers=CATALOGUE_WORKERS, rpm=CATALOGUE_RPM, issues=CATALOGUE_ISSUES,
+          directory=CATALOGUE_DIR, log=print):
+    """Generate a new catalogue version and make it current; returns the manifest.
+
+    Artifacts that fail to generate are carried over from the current
+    version when it has them, so one bad call never empties the menu.
+    """
+    from app.helpers import ai_chat, clean_steps   # the web layer's call path (routing, cache, breaker)
+
+    apps = list(apps or APPS)
+    limiter = RateLimiter(rpm)
+    previous = _read_version(directory, _current_name(directory)) or {}
+
+    def call(messages, site):
+        limiter.wait()
+        with governor.speculative(max_wait=None):   # behind live traffic, but never shed
+            return ai_chat(messages, site)
+
+    def guide(app_name, problem):
+        return {"problem": problem, "steps": clean_steps(call(troubleshoot_messages(app_name, problem), "troubleshoot"))}
+
+    start = time.time()
+    results = {a: {"lesson": None, "issues": []} for a in apps}
+    failures = []
+    with ThreadPoolExecutor(workers, thread_name_prefix="catalogue") as pool:
+        lessons = {a: pool.submit(call, lesson_messages(a), "teach") for a in apps}
+        lists = {a: pool.submit(call, common_issues_messages(a, issues), "troubleshoot") for a in apps}
+        guides = []
+        for a, future in lists.items():
+            try:
+                problems = [p.lstrip("0123456789.-•) ").strip() for p in future.result().splitlines()]
+                guides += [(a, pool.submit(guide, a, p)) for p in [p for p in problems if p][:issues]]
+            except Exception as e:
+                failures.append(f"{a} issues: {e}")
+        for a, future in lessons.items():
+            try:
+                results[a]["lesson"] = future.result()
+            except Exception as e:
+                failures.append(f"{a} lesson: {e}")
+        for a, future in guides:
+            try:
+                results[a]["issues"].append(future.result())
+            except Exception as e:
+                failures.append(f"{a} guide: {e}")
+
+    for a, item in results.items():
+        old = previous.get("apps", {}).get(a, {})
+        if not item["lesson"] and old.get("lesson"):
+            item["lesson"] = old["lesson"]
+        if not item["issues"] and old.get("issues"):
+            item["issues"] = old["issues"]
+    for a, old in previous.get("apps", {}).items():
+        results.setdefault(a, old)   # apps not rebuilt this time
+
+    if not any(item["lesson"] or item["issues"] for item in results.values()):
+        raise RuntimeError("catalogue build produced nothing: " + "; ".join(failures))
+
+    version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(start))
+    manifest = {"version": version, "created": start, "seconds": round(time.time() - start, 1),
+                "fingerprint": fingerprint(), "apps": sorted(results), "failures": failures}
+    path = os.path.join(directory, version)
+    os.makedirs(path, exist_ok=True)
+    for a, item in results.items():
+        _write_json(os.path.join(path, f"{a}.json"), item)
+    _write_json(os.path.join(path, "manifest.json"), manifest)
+    _write_text(os.path.join(directory, "current"), version)
+    _prune(directory)
+    for f in failures:
+        log(f"⚠️ {f}")
+    log(f"📚 catalogue {version}: {len(results)} apps in {manifest['seconds']}s, {len(failures)} failures")
+    return manifest
+
+
+class Catalogue:
+    """The current catalogue version, held in memory."""
+
+    def __init__(self, directory=CATALOGUE_DIR):
+        self.directory = directory
+        self.version = None
+        self.manifest = {}
+        self._apps = {}            # app (lower case) -> {"lesson", "issues"}
+        self._checked = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(Re)load the current version from disk; returns True if one was found."""
+        name = _current_name(self.directory)
+        data = _read_version(self.directory, name)
+        if data is None:
+            return False
+        with self._lock:
+            self.version, self.manifest = name, data["manifest"]
+            self._apps = {a.lower(): item for a, item in data["apps"].items()}
+            self._checked = time.monotonic()
+        self._seed_troubleshooter()
+        age_days = (time.time() - self.manifest.get("created", 0)) / 86400
+        print(f"📚 catalogue {name} loaded ({len(self._apps)} apps, {age_days:.1f} days old"
+              f"{', stale' if self.stale() else ''})")
+        self._maybe_refresh()
+        return True
+
+    def lesson(self, app_name):
+        """The precomputed lesson for app_name, or None."""
+        self._maybe_reload()
+        item = self._apps.get(app_name.lower())
+        return item.get("lesson") if item else None
+
+    def issues(self, app_name):
+        self._maybe_reload()
+        item = self._apps.get(app_name.lower())
+        return list(item.get("issues") or []) if item else []
+
+    def stale(self):
+        if not self.manifest:
+            return True
+        too_old = time.time() - self.manifest.get("created", 0) > CATALOGUE_MAX_AGE
+        return too_old or self.manifest.get("fingerprint") != fingerprint()
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < CATALOGUE_RELOAD_INTERVAL:
+            return
+        self._checked = now
+        if _current_name(self.directory) not in (None, self.version):
+            self.load()
+        else:
+            self._maybe_refresh()
+
+    def _maybe_refresh(self):
+        if not CATALOGUE_REFRESH or self._refreshing or not self.stale():
+            return
+        self._refreshing = True
+        threading.Thread(target=self._refresh, name="catalogue-refresh", daemon=True).start()
+
+    def _refresh(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, "build.lock"), "a") as lock:
+                if fcntl:
+                    try:
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        return   # another process is already rebuilding
+                if _current_name(self.directory) == self.version:
+                    build(directory=self.directory)
+            self.load()
+        except Exception as e:
+            print("⚠️ Catalogue refresh failed:", e)
+        finally:
+            self._refreshing = False
+
+    def _seed_troubleshooter(self):
+        from app.services.semantic_cache import ask_help_cache
+        for item_app, item in self._apps.items():
+            for issue in item.get("issues") or []:
+                ask_help_cache.seed(item_app, issue["problem"], issue["steps"])
+
+
+def _current_name(directory):
+    try:
+        with open(os.path.join(directory, "current"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _read_version(directory, name):
+    if not name:
+        return None
+    path = os.path.join(directory, name)
+    try:
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        apps = {}
+        for a in manifest["apps"]:
+            with open(os.path.join(path, f"{a}.json"), encoding="utf-8") as f:
+                apps[a] = json.load(f)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Catalogue version {name} is unreadable:", e)
+        return None
+    return {"manifest": manifest, "apps": apps}
+
+def _write_json(path, data):
+    _write_text(path, json.dumps(data, ensure_ascii=False, indent=1))
+
+def _write_text(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def _prune(directory):
+    versions = sorted(d for d in os.listdir(directory)
+                      if os.path.isfile(os.path.join(directory, d, "manifest.json")))
+    for old in versions[:-CATALOGUE_KEEP]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+
+
+catalogue = Catalogue()
+
+
+def register_commands(app):
+    import click
+
+    @app.cli.command("catalogue-build")
+    @click.option("--apps", help="Comma-separated apps to rebuild (default: the whole menu).")
+    @click.option("--workers", default=CATALOGUE_WORKERS, show_default=True)
+    @click.option("--rpm", default=CATALOGUE_RPM, show_default=True, help="Upstream calls per minute.")
+    @click.option("--issues", default=CATALOGUE_ISSUES, show_default=True, help="Common issues per app.")
+    def catalogue_build(apps, workers, rpm, issues):
+        """Generate lessons and common-issue guides as a new catalogue version."""
+        build(apps=apps.split(",") if apps else None, workers=workers, rpm=rpm, issues=issues, log=click.echo)
@@ -0,0 +1,57 @@
+"""The one code path every non-streaming chat completion goes through.
+
+helpers.ai_chat (the main routes) and services.ai.ask_gpt (the blueprint
+routes) both call complete(), so caching and other cross-cutting behaviour
+only has to be written once. Which model and limits they pass is decided
+per call site in services.routing.
+"""
+import time
+from app.services.cache import response_cache, cache_key
+from app.services.singleflight import flight
+from app.services.openai_client import call_openai
+from app.services.governor import upstream_slot
+from app.services.metrics import registry, record_upstream
+
+
+def complete(messages, model, temperature=None, cache=False, max_tokens=None, site=None):
+    """Run a chat completion and return the stripped reply text.
+
+    cache=True serves repeated identical requests from the response cache;
+    routes opt in only where the same input should get the same answer.
+    Concurrent identical requests in this process always share one upstream
+    call, cached or not. site sets the call's priority in the governor.
+    """
+    key = cache_key(model, temperature, messages, max_tokens)
+    if cache:
+        hit = response_cache.get(key)
+        if hit is not None:
+            registry.inc("ai_requests_total", (("model", model), ("cache", "hit")))
+            return hit
+
+    ran = False
+
+    def call():
+        nonlocal ran
+        ran = True
+        kwargs = {} if temperature is None else {"temperature": temperature}
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        start = time.perf_counter()
+        try:
+            with upstream_slot(site, messages, max_tokens) as slot:
+                resp = call_openai(lambda client: client.chat.completions.create(
+                    model=model, messages=messages, **kwargs))
+                slot.settle(resp.usage)
+        except Exception:
+            registry.inc("ai_upstream_errors_total", (("model", model),))
+            raise
+        record_upstream(model, time.perf_counter() - start, resp.usage, "miss" if cache else "off")
+        text = resp.choices[0].message.content.strip()
+        if cache:
+            response_cache.set(key, text)
+        return text
+
+    text = flight.do(key, call)
+    if not ran:
+        registry.inc("ai_requests_total", (("model", model), ("cache", "coalesced")))
+    return text
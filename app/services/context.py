@@ -0,0 +1,82 @@
+"""Keep long Prompt Builder conversations inside a token budget.
+
+The system prompt and the most recent turns are always sent verbatim.
+Once the conversation outgrows PB_CONTEXT_BUDGET, older turns are folded
+into a running summary that is stored with the conversation, so each turn
+is summarized once rather than on every request.
+"""
+import importlib.util, os
+from app.services.convo_store import get_store
+
+PB_CONTEXT_TRIM   = os.getenv("PB_CONTEXT_TRIM", "0") == "1"
+PB_CONTEXT_BUDGET = int(os.getenv("PB_CONTEXT_BUDGET", "3000"))   # prompt tokens
+PB_KEEP_TURNS     = max(1, int(os.getenv("PB_KEEP_TURNS", "6")))  # messages kept verbatim
+
+# tiktoken is optional (else a character estimate) and imported on first use.
+HAVE_TIKTOKEN = importlib.util.find_spec("tiktoken") is not None
+_encoding = None
+
+def count_tokens(text):
+    """Token count of text (tiktoken when installed, else ~4 chars/token)."""
+    global _encoding
+    if HAVE_TIKTOKEN:
+        if _encoding is None:
+            import tiktoken
+            try:
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+def message_tokens(messages):
+    """Approximate prompt tokens for a message list (content + per-message overhead)."""
+    return sum(count_tokens(m["content"]) + 4 for m in messages)
+
+
+def _summary_request(previous, turns):
+    transcript = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in turns)
+    return [
+        {"role": "system", "content": (
+            "You compress conversations. Merge the existing summary and the new turns into one "
+            "short summary that keeps every fact the user gave (app, goal, audience, tone, "
+            "constraints, answers to questions). Plain sentences, no preamble."
+        )},
+        {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"},
+    ]
+
+def _view(system, summary, recent):
+    if not summary:
+        return system + recent
+    return system + [{"role": "system", "content": "Summary of the earlier conversation:\n" + summary}] + recent
+
+
+def fit_context(cid, messages, chat):
+    """Return (messages_to_send, report) for a conversation about to be sent.
+
+    messages is the full conversation including the new user turn; chat is
+    the completion function used to update the summary. report is None when
+    trimming is off, otherwise a dict of token counts before and after; the
+    full conversation is sent whenever the summarized one is not smaller.
+    """
+    if not PB_CONTEXT_TRIM:
+        return messages, None
+
+    n_system = 1 if messages and messages[0]["role"] == "system" else 0
+    system, body = messages[:n_system], messages[n_system:]
+    store = get_store()
+    summary, upto = store.get_summary(cid)
+    upto = min(upto, len(body))
+
+    view = _view(system, summary, body[upto:])
+    fold_to = len(body) - PB_KEEP_TURNS
+    if message_tokens(view) > PB_CONTEXT_BUDGET and fold_to > upto:
+        summary = chat(_summary_request(summary, body[upto:fold_to]))
+        upto = fold_to
+        store.set_summary(cid, summary, upto)
+        view = _view(system, summary, body[upto:])
+
+    before, after = message_tokens(messages), message_tokens(view)
+    if after >= before:   # a summary longer than the turns it replaces saves nothing
+        view, after = messages, before
+    return view, {"tokens_before": before, "tokens_after": after, "tokens_saved": before - after}
@@ -0,0 +1,220 @@
+"""Server-side storage for Prompt Builder conversations.
+
+The session cookie only carries a short conversation id; the messages live
+here. MemoryStore keeps them in-process (LRU + TTL), SqliteStore keeps them
+in a file that every gunicorn worker on the box can share.
+"""
+import os, sqlite3, threading, time
+from collections import OrderedDict
+from app.services.blocking import blocking
+
+CONVO_STORE = os.getenv("CONVO_STORE", "sqlite")          # "sqlite" or "memory"
+CONVO_DB    = os.getenv("CONVO_DB", os.path.join("prompt_log", "convos.db"))
+CONVO_TTL   = int(os.getenv("CONVO_TTL", "14400"))          # seconds idle before a convo expires
+CONVO_MAX   = int(os.getenv("CONVO_MAX", "2000"))           # memory backend only
+
+
+class MemoryStore:
+    """In-process LRU of conversations with an idle TTL."""
+
+    def __init__(self, max_convos=CONVO_MAX, ttl=CONVO_TTL):
+        self.max_convos = max_convos
+        self.ttl = ttl
+        self._convos = OrderedDict()   # cid -> (last_used, [messages])
+        self._summaries = {}           # cid -> (summary, messages folded into it)
+        self._lock = threading.Lock()
+
+    def get(self, cid):
+        """Return a copy of the messages for cid ([] if unknown or expired)."""
+        with self._lock:
+            entry = self._convos.get(cid)
+            if entry is None:
+                return []
+            if time.time() - entry[0] > self.ttl:
+                del self._convos[cid]
+                self._summaries.pop(cid, None)
+                return []
+            self._convos.move_to_end(cid)
+            return list(entry[1])
+
+    def append(self, cid, *messages):
+        """Append messages to cid, creating the conversation if needed."""
+        with self._lock:
+            entry = self._convos.pop(cid, None)
+            if entry and time.time() - entry[0] <= self.ttl:
+                msgs = entry[1]
+            else:
+                msgs = []
+                self._summaries.pop(cid, None)
+            msgs.extend(messages)
+            self._convos[cid] = (time.time(), msgs)
+            while len(self._convos) > self.max_convos:
+                old, _ = self._convos.popitem(last=False)
+                self._summaries.pop(old, None)
+
+    def reset(self, cid, messages):
+        """Replace the conversation with a fresh message list."""
+        self.delete(cid)
+        self.append(cid, *messages)
+
+    def delete(self, cid):
+        with self._lock:
+            self._convos.pop(cid, None)
+            self._summaries.pop(cid, None)
+
+    def get_summary(self, cid):
+        """Return (summary, n) where the first n non-system messages are folded in."""
+        with self._lock:
+            return self._summaries.get(cid, ("", 0))
+
+    def set_summary(self, cid, summary, upto):
+        with self._lock:
+            if cid in self._convos:
+                self._summaries[cid] = (summary, upto)
+
+
+class SqliteStore:
+    """Conversations in a SQLite file, shared by all workers on the host.
+
+    Messages are one row each, so adding a turn is a single INSERT rather
+    than rewriting the whole conversation. The public methods run through
+    services.blocking, so a wait for the write lock parks one greenlet
+    rather than the whole gevent worker.
+    """
+
+    def __init__(self, path=CONVO_DB, ttl=CONVO_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().db.executescript("""
+            CREATE TABLE IF NOT EXISTS convos (
+                cid     TEXT PRIMARY KEY,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                cid     TEXT NOT NULL,
+                seq     INTEGER NOT NULL,
+                role    TEXT NOT NULL,
+                content TEXT NOT NULL,
+                PRIMARY KEY (cid, seq)
+            );
+            CREATE INDEX IF NOT EXISTS convos_updated ON convos(updated);
+            CREATE TABLE IF NOT EXISTS summaries (
+                cid     TEXT PRIMARY KEY,
+                upto    INTEGER NOT NULL,
+                summary TEXT NOT NULL
+            );
+        """)
+
+    def _conn(self, mode="IMMEDIATE"):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return _Tx(db, mode)
+
+    @blocking
+    def get(self, cid):
+        if not cid:
+            return []
+        # Read only, so no write lock; append() refreshes `updated` on every turn.
+        with self._conn("DEFERRED") as db:
+            row = db.execute("SELECT updated FROM convos WHERE cid = ?", (cid,)).fetchone()
+            if row is None or time.time() - row[0] > self.ttl:
+                return []
+            rows = db.execute(
+                "SELECT role, content FROM messages WHERE cid = ? ORDER BY seq", (cid,)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    @blocking
+    def append(self, cid, *messages):
+        now = time.time()
+        with self._conn() as db:
+            row = db.execute("SELECT updated FROM convos WHERE cid = ?", (cid,)).fetchone()
+            if row is not None and now - row[0] > self.ttl:
+                db.execute("DELETE FROM messages WHERE cid = ?", (cid,))
+                db.execute("DELETE FROM summaries WHERE cid = ?", (cid,))
+            db.execute(
+                "INSERT INTO convos (cid, updated) VALUES (?, ?) "
+                "ON CONFLICT(cid) DO UPDATE SET updated = excluded.updated",
+                (cid, now),
+            )
+            (seq,) = db.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE cid = ?", (cid,)
+            ).fetchone()
+            db.executemany(
+                "INSERT INTO messages (cid, seq, role, content) VALUES (?, ?, ?, ?)",
+                [(cid, seq + i, m["role"], m["content"]) for i, m in enumerate(messages)],
+            )
+        self._purge_expired(now)
+
+    @blocking
+    def reset(self, cid, messages):
+        self.delete(cid)
+        self.append(cid, *messages)
+
+    @blocking
+    def delete(self, cid):
+        with self._conn() as db:
+            db.execute("DELETE FROM messages WHERE cid = ?", (cid,))
+            db.execute("DELETE FROM summaries WHERE cid = ?", (cid,))
+            db.execute("DELETE FROM convos WHERE cid = ?", (cid,))
+
+    @blocking
+    def get_summary(self, cid):
+        with self._conn("DEFERRED") as db:
+            row = db.execute("SELECT summary, upto FROM summaries WHERE cid = ?", (cid,)).fetchone()
+        return row or ("", 0)
+
+    @blocking
+    def set_summary(self, cid, summary, upto):
+        with self._conn() as db:
+            db.execute("INSERT OR REPLACE INTO summaries (cid, upto, summary) VALUES (?, ?, ?)",
+                       (cid, upto, summary))
+
+    def _purge_expired(self, now):
+        if now - self._last_purge < 300:
+            return
+        self._last_purge = now
+        cutoff = now - self.ttl
+        with self._conn() as db:
+            db.execute("DELETE FROM messages WHERE cid IN (SELECT cid FROM convos WHERE updated < ?)", (cutoff,))
+            db.execute("DELETE FROM summaries WHERE cid IN (SELECT cid FROM convos WHERE updated < ?)", (cutoff,))
+            db.execute("DELETE FROM convos WHERE updated < ?", (cutoff,))
+
+
+class _Tx:
+    """Run the block in one transaction on an autocommit connection.
+
+    IMMEDIATE takes the write lock up front; DEFERRED suits blocks that only
+    read, which in WAL mode never wait for a writer.
+    """
+
+    def __init__(self, db, mode="IMMEDIATE"):
+        self.db = db
+        self.mode = mode
+
+    def __enter__(self):
+        self.db.execute(f"BEGIN {self.mode}")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Return the process-wide conversation store, built from CONVO_STORE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MemoryStore() if CONVO_STORE == "memory" else SqliteStore()
+    return _store
@@ -0,0 +1,284 @@
+"""Admission control in front of every upstream model call.
+
+Each worker has one Governor, and every chat completion passes through
+upstream_slot() (services.completions and helpers.ai_chat_stream). A call
+starts when a concurrency slot is free and the per-minute budgets allow it:
+
+  AI_MAX_CONCURRENCY   simultaneous upstream calls per worker
+  AI_RPM_LIMIT         requests per minute  \\  for the whole deployment, split
+  AI_TPM_LIMIT         tokens per minute    /  across AI_GOVERNOR_PROCESSES
+                                               workers (0 = no limit)
+
+Tokens are reserved from a cheap estimate (prompt characters / 4 plus the
+call's max_tokens, or AI_COMPLETION_ESTIMATE) and settled against the usage
+OpenAI reports.
+
+Calls that cannot start queue. The queue is ordered by priority (final
+answers, then interactive calls, then explanations, then speculative work
+such as prefetches and catalogue builds) and, within a priority, by how
+many calls the session has running or recently started (decaying over
+AI_FAIR_WINDOW), so one busy user cannot crowd out everyone else. A
+session may have at most AI_SESSION_MAX_QUEUED calls waiting. Work a request
+hands to a thread pool (prefetches, the batch explain fan-out) has no
+request context there, so the request captures request_session_key() and
+the pool runs the work under governor.acting_for(key). A call whose
+wait would exceed AI_SLOT_TIMEOUT (AI_SPECULATIVE_WAIT for speculative
+work) is shed with UpstreamBusy: "busy, retry in N s", answered as a 503
+with Retry-After.
+"""
+import itertools, math, os, threading, time
+from contextlib import contextmanager
+from flask import has_request_context, request, session
+from app.services.metrics import registry
+from app.services.openai_client import UpstreamUnavailable
+
+AI_MAX_CONCURRENCY     = int(os.getenv("AI_MAX_CONCURRENCY", "32"))        # upstream calls per worker
+AI_SLOT_TIMEOUT        = float(os.getenv("AI_SLOT_TIMEOUT", "30"))         # longest a user's call may queue
+AI_SPECULATIVE_WAIT    = float(os.getenv("AI_SPECULATIVE_WAIT", "2"))      # ... and a speculative one
+AI_RPM_LIMIT           = float(os.getenv("AI_RPM_LIMIT", "0"))
+AI_TPM_LIMIT           = float(os.getenv("AI_TPM_LIMIT", "0"))
+AI_GOVERNOR_PROCESSES  = max(1, int(os.getenv("AI_GOVERNOR_PROCESSES", os.getenv("WEB_CONCURRENCY", "2"))))
+AI_COMPLETION_ESTIMATE = int(os.getenv("AI_COMPLETION_ESTIMATE", "400"))   # tokens, when max_tokens is unset
+AI_SESSION_MAX_QUEUED  = int(os.getenv("AI_SESSION_MAX_QUEUED", "8"))
+AI_FAIR_WINDOW         = float(os.getenv("AI_FAIR_WINDOW", "60"))          # seconds of history fair share counts
+
+# Lower runs first. Sites not listed are interactive.
+PRIORITIES = {"finalize": 0, "clarify": 1, "summarize": 1, "troubleshoot": 1, "teach": 1, "assist": 1, "explain": 2}
+SPECULATIVE = 3
+PRIORITY_NAMES = {0: "finalize", 1: "interactive", 2: "explain", 3: "speculative"}
+
+registry.counter("ai_governor_admitted_total", "Upstream calls started, by priority and whether they queued.")
+registry.counter("ai_governor_shed_total", "Upstream calls rejected as busy, by priority and reason.")
+registry.histogram("ai_governor_wait_seconds", "Time upstream calls spent queued before starting, by priority.")
+
+
+class UpstreamBusy(UpstreamUnavailable):
+    """Shed by the governor; retry_after is the suggested wait in seconds."""
+
+    def __init__(self, retry_after):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"The assistant is busy right now. Please retry in {self.retry_after} s.")
+
+
+class TokenBucket:
+    """per_minute units, refilled continuously; per_minute=0 never limits."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount, now):
+        """Seconds until amount is available (0 if it is now)."""
+        if not self.capacity:
+            return 0.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        amount = min(amount, self.capacity)   # an oversized call runs once the bucket is full
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        if self.capacity:
+            self.level -= amount
+
+    def give(self, amount):
+        if self.capacity:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class Ticket:
+    """One admitted call; settle(usage) replaces the token estimate with what was used."""
+
+    def __init__(self, governor, priority, session_key, tokens):
+        self.governor = governor
+        self.priority = priority
+        self.session = session_key
+        self.tokens = tokens
+        self.seq = math.inf
+        self.queued_at = time.monotonic()
+        self.started = None
+        self.event = threading.Event()
+
+    def settle(self, usage):
+        total = getattr(usage, "total_tokens", None)
+        if total is None:
+            return
+        with self.governor._lock:
+            self.governor.tokens.give(self.tokens - total)   # negative when we under-estimated
+        self.tokens = total
+
+
+def estimate_tokens(messages, max_tokens=None):
+    prompt = sum(len(str(m.get("content") or "")) // 4 + 4 for m in messages if isinstance(m, dict))
+    return prompt + (max_tokens or AI_COMPLETION_ESTIMATE)
+
+def request_session_key():
+    """The current request's session key, or None outside a request (e.g. the catalogue build)."""
+    if not has_request_context():
+        return None
+    return session.get("uid") or session.get("pb_cid") or request.remote_addr
+
+
+class Governor:
+    def __init__(self, concurrency=AI_MAX_CONCURRENCY, rpm=AI_RPM_LIMIT, tpm=AI_TPM_LIMIT,
+                 processes=AI_GOVERNOR_PROCESSES):
+        self.concurrency = max(1, concurrency)
+        self.requests = TokenBucket(rpm / processes)
+        self.tokens = TokenBucket(tpm / processes)
+        self.inflight = 0
+        self._running = {}          # session -> calls in flight
+        self._recent = {}           # session -> (decaying count of calls started, as of)
+        self._queue = []            # Tickets waiting, in arrival order
+        self._call_seconds = 5.0    # moving average, for Retry-After
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def speculative(self, max_wait=AI_SPECULATIVE_WAIT):
+        """Run calls made in this block at the lowest priority; max_wait=None never sheds them."""
+        previous = getattr(self._local, "speculative", None)
+        self._local.speculative = {"max_wait": max_wait}
+        try:
+            yield
+        finally:
+            self._local.speculative = previous
+
+    @contextmanager
+    def acting_for(self, session_key):
+        """Count calls made in this block against session_key (pool work started by a request)."""
+        previous = getattr(self._local, "session", None)
+        self._local.session = session_key
+        try:
+            yield
+        finally:
+            self._local.session = previous
+
+    @contextmanager
+    def slot(self, site=None, messages=(), max_tokens=None, session_key=None):
+        """Wait for admission, then hold it for the duration of one upstream call.
+
+        session_key defaults to the one set by acting_for(), else the request's.
+        """
+        spec = getattr(self._local, "speculative", None)
+        if spec is not None:
+            priority, max_wait = SPECULATIVE, spec["max_wait"]
+        else:
+            priority, max_wait = PRIORITIES.get(site, 1), AI_SLOT_TIMEOUT
+        session_key = session_key or getattr(self._local, "session", None) or request_session_key()
+        ticket = self._admit(Ticket(self, priority, session_key, estimate_tokens(messages, max_tokens)), max_wait)
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    def _admit(self, ticket, max_wait):
+        name = PRIORITY_NAMES[ticket.priority]
+        with self._lock:
+            if ticket.session is not None and \
+                    sum(t.session == ticket.session for t in self._queue) >= AI_SESSION_MAX_QUEUED:
+                self._shed(ticket, "session", self._retry_after(ticket))
+            ticket.seq = next(self._seq)
+            self._queue.append(ticket)
+            head_wait = self._dispatch()
+            if ticket.started is None and max_wait is not None:
+                predicted = self._retry_after(ticket)
+                if predicted > max_wait:
+                    self._queue.remove(ticket)
+                    self._shed(ticket, "predicted", predicted)
+        deadline = None if max_wait is None else ticket.queued_at + max_wait
+        while ticket.started is None:
+            timeout = head_wait if deadline is None else min(head_wait, deadline - time.monotonic())
+            ticket.event.wait(max(0.01, timeout))
+            with self._lock:
+                head_wait = self._dispatch()
+                if ticket.started is None and deadline is not None and time.monotonic() >= deadline:
+                    self._queue.remove(ticket)
+                    self._dispatch()
+                    self._shed(ticket, "timeout", self._retry_after(ticket))
+        waited = ticket.started - ticket.queued_at
+        registry.inc("ai_governor_admitted_total", (("priority", name), ("queued", str(waited > 0.001).lower())))
+        registry.observe("ai_governor_wait_seconds", waited, (("priority", name),))
+        return ticket
+
+    def _dispatch(self):
+        """Start queued calls in order while capacity allows; return seconds until the head could start.
+
+        Called with the lock held. The head is never skipped for a smaller
+        call behind it, so a large request cannot be starved.
+        """
+        now = time.monotonic()
+        while self._queue:
+            head = min(self._queue, key=lambda t: (t.priority, self._share(t.session, now), t.seq))
+            if self.inflight >= self.concurrency:
+                return 1.0   # woken by _release; the timeout is only a safety net
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(head.tokens, now))
+            if wait > 0:
+                return wait
+            self._queue.remove(head)
+            self.requests.take(1)
+            self.tokens.take(head.tokens)
+            self.inflight += 1
+            self._running[head.session] = self._running.get(head.session, 0) + 1
+            self._recent[head.session] = (self._decayed(head.session, now) + 1, now)
+            head.started = now
+            head.event.set()
+        return 1.0
+
+    def _decayed(self, session_key, now):
+        count, as_of = self._recent.get(session_key, (0.0, now))
+        return count * math.exp((as_of - now) / AI_FAIR_WINDOW)
+
+    def _share(self, session_key, now):
+        """How much of the upstream a session is using: calls running plus recent starts."""
+        return self._running.get(session_key, 0) + self._decayed(session_key, now)
+
+    def _release(self, ticket):
+        with self._lock:
+            self.inflight -= 1
+            left = self._running.get(ticket.session, 1) - 1
+            if left:
+                self._running[ticket.session] = left
+            else:
+                self._running.pop(ticket.session, None)
+            now = time.monotonic()
+            self._call_seconds = 0.9 * self._call_seconds + 0.1 * (now - ticket.started)
+            if len(self._recent) > 1000:   # forget sessions whose history has decayed away
+                self._recent = {s: v for s, v in self._recent.items() if self._decayed(s, now) > 0.01}
+            self._dispatch()
+
+    def _retry_after(self, ticket):
+        """Rough seconds until ticket could start: budget refill or slots turning over."""
+        ahead = [t for t in self._queue if (t.priority, t.seq) < (ticket.priority, ticket.seq)]
+        now = time.monotonic()
+        budget = max(self.requests.wait_time(len(ahead) + 1, now),
+                     self.tokens.wait_time(sum(t.tokens for t in ahead) + ticket.tokens, now))
+        slots = 0.0
+        if self.inflight >= self.concurrency:
+            slots = self._call_seconds * (len(ahead) // self.concurrency + 1)
+        return max(budget, slots)
+
+    def _shed(self, ticket, reason, retry_after):
+        registry.inc("ai_governor_shed_total", (("priority", PRIORITY_NAMES[ticket.priority]), ("reason", reason)))
+        raise UpstreamBusy(retry_after)
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            oldest = dict.fromkeys(depth, 0.0)
+            for t in self._queue:
+                name = PRIORITY_NAMES[t.priority]
+                depth[name] += 1
+                oldest[name] = max(oldest[name], now - t.queued_at)
+            return {"inflight": self.inflight, "queued": depth, "oldest_wait": oldest,
+                    "requests_available": self.requests.level if self.requests.capacity else None,
+                    "tokens_available": self.tokens.level if self.tokens.capacity else None}
+
+
+governor = Governor()
+
+def upstream_slot(site=None, messages=(), max_tokens=None, session_key=None):
+    """Hold admission for one upstream call; see Governor.slot."""
+    return governor.slot(site, messages, max_tokens, session_key)
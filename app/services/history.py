@@ -1,17 +1,9 @@
-import csv
 from flask import current_app
+from .log_writer import get_writer
+from .history_index import index_log
+
+HEADER = ["timestamp","app","task","prompt","manual_summary"]
 
 def log_prompt_row(row):
-    path = current_app.config["PROMPTS_CSV"]
-    header = ["timestamp","app","task","prompt","manual_summary"]
-    write_header = False
-    try:
-        with open(path, "r", newline="", encoding="utf-8") as f:
-            pass
-    except FileNotFoundError:
-        write_header = True
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=header)
-        if write_header:
-            w.writeheader()
-        w.writerow(row)
+    """Queue a history row for PROMPTS_CSV; the header is written with each new file."""
+    get_writer(current_app.config["PROMPTS_CSV"], header=HEADER, on_batch=index_log).write(row)
@@ -0,0 +1,288 @@
+"""Searchable prompt history in SQLite with full-text search.
+
+The CSV logs stay the system of record; this index mirrors them. Each log
+file is imported incrementally from the byte offset reached last time, and
+the live logs are imported right after every batch the background writer
+appends, so the index is only ever a flush interval behind. Searches use
+FTS5 over task, prompt and manual steps, filter by app and date on a
+B-tree index, and page through results.
+"""
+import csv, gzip, hashlib, io, json, os, re, sqlite3, threading, time
+from collections import Counter
+from app.services.blocking import blocking
+from app.services.convo_store import _Tx
+from app.services.log_writer import file_lock
+
+HISTORY_INDEX = os.getenv("HISTORY_INDEX", "1") == "1"      # index live logs as they are written
+HISTORY_DB    = os.getenv("HISTORY_DB", os.path.join("prompt_log", "history.db"))
+HISTORY_MAX_PAGE = 100
+
+# CSV header name -> index column, for logs written with a header row.
+_HEADER_COLUMNS = {"timestamp": "ts", "app": "app", "task": "task", "prompt": "prompt",
+                   "manual_summary": "manual", "manual": "manual"}
+# Header-less logs (prompt_log/prompts.csv) are task, prompt, manual steps
+# and app; rows logged before the app was recorded have only the first three.
+_PLAIN_COLUMNS = ["task", "prompt", "manual", "app"]
+# A log_writer archive, prompts-20250101-120000[-1].csv.gz, and the live file it came from.
+_ARCHIVE = re.compile(r"^(.*)-\d{8}-\d{6}(?:-\d+)?(\.[^.]+)\.gz$")
+
+
+class HistoryIndex:
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().db.executescript("""
+            CREATE TABLE IF NOT EXISTS prompts (
+                id     INTEGER PRIMARY KEY,
+                ts     TEXT,
+                app    TEXT NOT NULL DEFAULT '',
+                task   TEXT NOT NULL DEFAULT '',
+                prompt TEXT NOT NULL DEFAULT '',
+                manual TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS prompts_ts ON prompts(ts);
+            CREATE INDEX IF NOT EXISTS prompts_app_ts ON prompts(app COLLATE NOCASE, ts);
+            CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts USING fts5(
+                task, prompt, manual, content='prompts', content_rowid='id',
+                tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS prompts_ai AFTER INSERT ON prompts BEGIN
+                INSERT INTO prompts_fts(rowid, task, prompt, manual)
+                VALUES (new.id, new.task, new.prompt, new.manual);
+            END;
+            CREATE TRIGGER IF NOT EXISTS prompts_ad AFTER DELETE ON prompts BEGIN
+                INSERT INTO prompts_fts(prompts_fts, rowid, task, prompt, manual)
+                VALUES ('delete', old.id, old.task, old.prompt, old.manual);
+            END;
+            CREATE TABLE IF NOT EXISTS imports (
+                path    TEXT PRIMARY KEY,
+                inode   INTEGER NOT NULL,
+                offset  INTEGER NOT NULL,
+                columns TEXT NOT NULL,
+                rows    INTEGER NOT NULL
+            );
+        """)
+
+    def _conn(self, mode="IMMEDIATE"):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return _Tx(db, mode)
+
+    # ---- import ----
+    @blocking
+    def import_csv(self, path, lock=True, stamp_from=None):
+        """Index rows appended to path since the last import; returns the count.
+
+        lock=False is for callers that already hold the file's write lock
+        (the log writer's on_batch hook). stamp_from is a byte offset: rows
+        that start at or past it and carry no timestamp are dated with the
+        current time, which is right for the batch the writer just
+        appended; anything before it is a backfill of unknown age and keeps
+        a NULL timestamp. A .csv.gz archive is imported whole, once, minus
+        any rows that were already indexed from the live file before it
+        was rotated.
+        """
+        if lock:
+            with file_lock(path):
+                return self.import_csv(path, lock=False, stamp_from=stamp_from)
+        key = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return 0
+
+        with self._conn("DEFERRED") as db:
+            row = db.execute("SELECT inode, offset, columns FROM imports WHERE path = ?", (key,)).fetchone()
+        offset, columns = 0, None
+        if row is not None and row[0] == st.st_ino and row[1] <= st.st_size:
+            offset, columns = row[1], json.loads(row[2])   # same file, grown or unchanged
+        if offset == st.st_size or (path.endswith(".gz") and offset):
+            return 0
+
+        if path.endswith(".gz"):
+            with gzip.open(path, "rb") as f:
+                data = f.read()
+            end = st.st_size
+        else:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(st.st_size - offset)
+            # Only whole records: a row may still be half-written if the
+            # writer on this platform has no file lock.
+            data = data[:data.rfind(b"\n") + 1]
+            end = offset + len(data)
+        if not data:
+            return 0
+
+        # The writer appends whole rows, so stamp_from falls on a row boundary.
+        cut = len(data) if stamp_from is None else min(max(stamp_from - offset, 0), len(data))
+        now = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+        source = os.path.basename(path)
+        seen = self._indexed_live(path) if path.endswith(".gz") else Counter()
+        records = []
+        for chunk, ts in ((data[:cut], None), (data[cut:], now)):
+            reader = csv.reader(io.StringIO(chunk.decode("utf-8", errors="replace"), newline=""))
+            if columns is None:
+                first = next(reader, None)
+                if first is None:
+                    continue
+                if "task" in first and "prompt" in first:
+                    columns = [_HEADER_COLUMNS.get(name, "") for name in first]
+                else:
+                    columns = _PLAIN_COLUMNS
+                    reader = [first, *reader]
+            for values in reader:
+                rec = {"ts": None, "app": "", "task": "", "prompt": "", "manual": ""}
+                for col, value in zip(columns, values):
+                    if col:
+                        rec[col] = value
+                digest = _digest(rec["task"], rec["prompt"], rec["manual"])
+                if seen[digest]:
+                    seen[digest] -= 1
+                    continue
+                records.append((rec["ts"] or ts, rec["app"], rec["task"], rec["prompt"], rec["manual"], source))
+        if columns is None:
+            return 0
+
+        with self._conn() as db:
+            db.executemany(
+                "INSERT INTO prompts (ts, app, task, prompt, manual, source) VALUES (?, ?, ?, ?, ?, ?)",
+                records)
+            db.execute(
+                "INSERT INTO imports (path, inode, offset, columns, rows) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET inode = excluded.inode, offset = excluded.offset, "
+                "columns = excluded.columns, rows = CASE WHEN imports.inode = excluded.inode "
+                "THEN imports.rows + excluded.rows ELSE excluded.rows END",
+                (key, st.st_ino, end, json.dumps(columns), len(records)))
+        return len(records)
+
+    def _indexed_live(self, archive):
+        """Digests (with counts) of rows indexed from the live file an archive was rotated from."""
+        m = _ARCHIVE.match(os.path.basename(archive))
+        if not m:
+            return Counter()
+        with self._conn("DEFERRED") as db:
+            rows = db.execute("SELECT task, prompt, manual FROM prompts WHERE source = ?",
+                              (m.group(1) + m.group(2),)).fetchall()
+        return Counter(_digest(*r) for r in rows)
+
+    # ---- query ----
+    @blocking
+    def search(self, q="", app="", since="", until="", page=1, per_page=20, sort=""):
+        """Return {"items", "page", "per_page", "has_more"}.
+
+        q is matched as words (the last one as a prefix) against task,
+        prompt and manual steps and results are ranked by relevance, unless
+        sort="recent" or there is no q, when the newest come first.
+        sort="recent" is also the cheaper order for very common words.
+        since/until are ISO dates or timestamps, inclusive.
+        """
+        page = max(1, int(page))
+        per_page = min(max(1, int(per_page)), HISTORY_MAX_PAGE)
+        where, args = [], []
+        match = _match_expression(q)
+        if match:
+            where.append("prompts_fts MATCH ?")
+            args.append(match)
+        if app:
+            where.append("p.app = ? COLLATE NOCASE")
+            args.append(app)
+        if since:
+            where.append("p.ts >= ?")
+            args.append(since)
+        if until:
+            if len(until) == 10:   # a bare date includes the whole day
+                where.append("p.ts < date(?, '+1 day')")
+            else:
+                where.append("p.ts <= ?")
+            args.append(until)
+
+        sql = "SELECT p.id, p.ts, p.app, p.task, p.prompt, p.manual FROM prompts p"
+        if match:
+            sql += " JOIN prompts_fts ON prompts_fts.rowid = p.id"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if match and sort != "recent":
+            sql += " ORDER BY bm25(prompts_fts), p.id DESC"
+        else:
+            sql += " ORDER BY p.ts DESC, p.id DESC"
+        sql += " LIMIT ? OFFSET ?"
+        args += [per_page + 1, (page - 1) * per_page]
+
+        with self._conn("DEFERRED") as db:
+            rows = db.execute(sql, args).fetchall()
+        items = [_item(r) for r in rows[:per_page]]
+        return {"items": items, "page": page, "per_page": per_page, "has_more": len(rows) > per_page}
+
+    @blocking
+    def get(self, prompt_id):
+        with self._conn("DEFERRED") as db:
+            row = db.execute("SELECT id, ts, app, task, prompt, manual FROM prompts WHERE id = ?",
+                             (prompt_id,)).fetchone()
+        return _item(row) if row else None
+
+    @blocking
+    def stats(self):
+        with self._conn("DEFERRED") as db:
+            total = db.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+            apps = db.execute("SELECT app, COUNT(*) FROM prompts GROUP BY app COLLATE NOCASE").fetchall()
+        return {"prompts": total, "apps": {a or "": n for a, n in apps}}
+
+
+def _match_expression(q):
+    """Turn free text into a safe FTS5 query: quoted words, last one a prefix."""
+    words = [w.replace('"', '""') for w in (q or "").split()]
+    if not words:
+        return ""
+    return " ".join(f'"{w}"' for w in words[:-1]) + (" " if len(words) > 1 else "") + f'"{words[-1]}"*'
+
+def _digest(task, prompt, manual):
+    return hashlib.sha1("\0".join((task, prompt, manual)).encode("utf-8")).digest()
+
+def _item(row):
+    return dict(zip(("id", "timestamp", "app", "task", "prompt", "manual"), row))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    """The process-wide HistoryIndex, opened on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = HistoryIndex()
+    return _index
+
+def index_log(path, start):
+    """log_writer on_batch hook: index what the writer just appended at start."""
+    if HISTORY_INDEX:
+        get_index().import_csv(path, lock=False, stamp_from=start)
+
+
+def register_commands(app):
+    import click
+
+    @app.cli.command("history-import")
+    @click.argument("paths", nargs=-1)
+    def history_import(paths):
+        """Index prompt CSV logs (default: the live logs). Safe to re-run.
+
+        Rotated .csv.gz archives can be listed too; rows that were already
+        indexed from the live log are skipped.
+        """
+        paths = paths or [p for p in (os.path.join("prompt_log", "prompts.csv"),
+                                      app.config.get("PROMPTS_CSV")) if p]
+        index = get_index()
+        for path in paths:
+            start = time.perf_counter()
+            n = index.import_csv(path)
+            click.echo(f"{path}: {n} new rows ({time.perf_counter() - start:.2f}s)")
+        click.echo(f"index: {index.stats()}")
@@ -0,0 +1,196 @@
+"""Background, batched CSV logging.
+
+Request handlers only put a row on an in-memory queue. A daemon thread
+drains the queue in batches and appends each batch under an exclusive
+file lock, so rows from several gunicorn workers never interleave. Files
+are rotated by size and/or period and the rotated copy is gzipped. Under
+gevent workers the "thread" is a greenlet, so each batch is written on
+gevent's threadpool (services.blocking). Queued rows are flushed at
+interpreter exit.
+"""
+import atexit, csv, gzip, os, queue, shutil, threading, time
+from contextlib import contextmanager
+from app.services.blocking import offload
+
+try:
+    import fcntl
+except ImportError:   # Windows: only in-process ordering, no cross-process lock
+    fcntl = None
+
+LOG_FLUSH_INTERVAL  = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))            # seconds between batches
+LOG_BATCH_SIZE      = int(os.getenv("LOG_BATCH_SIZE", "200"))
+LOG_ROTATE_BYTES    = int(os.getenv("LOG_ROTATE_BYTES", str(10 * 1024 * 1024)))  # 0 = never by size
+LOG_ROTATE_INTERVAL = os.getenv("LOG_ROTATE_INTERVAL", "")                       # "", "daily" or "hourly"
+
+_PERIODS = {"daily": "%Y%m%d", "hourly": "%Y%m%d%H"}
+
+
+@contextmanager
+def file_lock(path):
+    """Hold the cross-process lock that guards writes to (and rotation of) path."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class CsvLogWriter:
+    """Append rows to one CSV file from a background thread.
+
+    Rows are lists, or dicts when a header is given (the header is written
+    whenever a new file is started). on_batch(path, start), if given, is
+    called after each batch while the file lock is still held, so it sees
+    the file exactly as written and before any later rotation; start is
+    the byte offset the batch was appended at.
+    """
+
+    def __init__(self, path, header=None, on_batch=None):
+        self.path = path
+        self.header = header
+        self.on_batch = on_batch
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def write(self, row):
+        """Queue a row; returns immediately.
+
+        After close() nothing drains the queue any more, so the row is
+        written straight away instead.
+        """
+        if self._closed:
+            try:
+                offload(self._write_batch, [row])
+            except Exception as e:
+                self.dropped += 1
+                print(f"⚠️ Failed to write a log row to {self.path} after close:", e)
+            return
+        self._ensure_thread()
+        self._queue.put(row)
+
+    def flush(self, timeout=10):
+        """Block until everything queued so far is on disk."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Flush what is queued; rows written from now on bypass the queue."""
+        self._closed = True
+        self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f"csv-log:{self.path}", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch, waiters = [], []
+            try:
+                item = self._queue.get(timeout=LOG_FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= LOG_BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    offload(self._write_batch, batch)   # flock, file I/O and on_batch block
+                except Exception as e:
+                    self.dropped += len(batch)
+                    print(f"⚠️ Failed to write {len(batch)} log rows to {self.path}:", e)
+            for w in waiters:
+                w.set()
+
+    def _write_batch(self, rows):
+        rotated = None
+        with file_lock(self.path):
+            rotated = self._maybe_rotate()
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                start = f.tell()
+                if self.header:
+                    w = csv.DictWriter(f, fieldnames=self.header)
+                    if f.tell() == 0:
+                        w.writeheader()
+                else:
+                    w = csv.writer(f)
+                w.writerows(rows)
+            if self.on_batch:
+                try:
+                    self.on_batch(self.path, start)
+                except Exception as e:
+                    print(f"⚠️ on_batch hook for {self.path} failed:", e)
+        self.written += len(rows)
+        if rotated:
+            _compress(rotated)
+
+    def _maybe_rotate(self):
+        """Rename the live file aside if it is too big or from an earlier period."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if st.st_size == 0:
+            return None
+        too_big = LOG_ROTATE_BYTES and st.st_size >= LOG_ROTATE_BYTES
+        fmt = _PERIODS.get(LOG_ROTATE_INTERVAL)
+        too_old = fmt and time.strftime(fmt, time.localtime(st.st_mtime)) != time.strftime(fmt)
+        if not (too_big or too_old):
+            return None
+        base, ext = os.path.splitext(self.path)
+        target = f"{base}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(st.st_mtime))}{ext}"
+        n = 1
+        while os.path.exists(target) or os.path.exists(target + ".gz"):
+            target = f"{base}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(st.st_mtime))}-{n}{ext}"
+            n += 1
+        os.replace(self.path, target)
+        return target
+
+
+def _compress(path):
+    try:
+        with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+    except OSError as e:
+        print(f"⚠️ Failed to compress rotated log {path}:", e)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_writer(path, header=None, on_batch=None):
+    """Return the shared writer for path, creating it on first use."""
+    key = os.path.abspath(path)
+    writer = _writers.get(key)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.setdefault(key, CsvLogWriter(path, header, on_batch))
+    return writer
+
+@atexit.register
+def _flush_all():
+    for writer in list(_writers.values()):
+        writer.close()
@@ -0,0 +1,155 @@
+"""Low-overhead counters and histograms, rendered in Prometheus text format.
+
+Each OS thread writes to its own shard, so recording a value never takes a
+lock; /metrics sums the shards when scraped. gevent greenlets share their
+thread's shard, which is safe because they only switch on I/O. Histograms
+use fixed buckets so an observation is a bisect plus two additions.
+"""
+import bisect, threading, time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Registry:
+    def __init__(self):
+        self._meta = {}      # name -> (kind, help, buckets)
+        self._shards = {}    # native thread id -> {(name, labels): value}
+        self._gauges = []    # (name, help, fn() -> {labels: value})
+        self._lock = threading.Lock()   # shard creation and gauge registration only
+
+    # ---- declaration ----
+    def counter(self, name, help):
+        self._meta[name] = ("counter", help, None)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        self._meta[name] = ("histogram", help, tuple(buckets))
+
+    def gauge(self, name, help, fn):
+        """Register fn, called at scrape time, returning {labels_tuple: value}."""
+        with self._lock:
+            self._gauges.append((name, help, fn))
+
+    # ---- hot path ----
+    def _shard(self):
+        tid = threading.get_native_id()
+        shard = self._shards.get(tid)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.setdefault(tid, {})
+        return shard
+
+    def inc(self, name, labels=(), amount=1):
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        buckets = self._meta[name][2]
+        shard = self._shard()
+        key = (name, labels)
+        h = shard.get(key)
+        if h is None:
+            h = shard[key] = [0] * (len(buckets) + 1) + [0.0]   # bucket counts, +Inf, sum
+        h[bisect.bisect_left(buckets, value)] += 1
+        h[-1] += value
+
+    # ---- scrape ----
+    def render(self):
+        totals = {}
+        for shard in list(self._shards.values()):
+            for key, value in shard.copy().items():
+                if isinstance(value, list):
+                    acc = totals.setdefault(key, [0] * len(value))
+                    for i, v in enumerate(value):
+                        acc[i] += v
+                else:
+                    totals[key] = totals.get(key, 0) + value
+
+        by_name = {}
+        for (name, labels), value in totals.items():
+            by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, help, buckets) in sorted(self._meta.items()):
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for labels, value in sorted(by_name.get(name, [])):
+                if kind == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(buckets + ("+Inf",), value[:-1]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {value[-1]:.6f}")
+                    lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+        for name, help, fn in list(self._gauges):
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            try:
+                values = fn()
+            except Exception as e:
+                print(f"⚠️ gauge {name} failed:", e)
+                continue
+            for labels, value in sorted(values.items()):
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+
+registry = Registry()
+
+registry.counter("http_requests_total", "HTTP requests by route, method and status.")
+registry.histogram("http_request_duration_seconds", "Time to produce response headers, by route.")
+registry.histogram("template_render_seconds", "Jinja render time, by template.")
+registry.counter("ai_requests_total", "Chat completions by model and cache outcome (hit, miss, coalesced, off, stream).")
+registry.histogram("ai_upstream_seconds", "Time spent waiting on OpenAI, by model.")
+registry.histogram("ai_first_token_seconds", "Time to the first streamed token, by model.")
+registry.counter("ai_tokens_total", "Tokens reported in OpenAI usage, by model and kind.")
+registry.counter("ai_upstream_errors_total", "Chat completions that raised, by model.")
+registry.counter("ai_escalations_total", "Malformed final answers retried on the strong model, by call site.")
+registry.counter("pb_context_tokens_saved_total", "Prompt tokens saved by Prompt Builder context trimming.")
+
+
+def record_upstream(model, seconds, usage, outcome):
+    """Record one upstream completion: its wall time, token usage and cache outcome."""
+    registry.inc("ai_requests_total", (("model", model), ("cache", outcome)))
+    registry.observe("ai_upstream_seconds", seconds, (("model", model),))
+    if usage is not None:
+        registry.inc("ai_tokens_total", (("model", model), ("kind", "prompt")), usage.prompt_tokens or 0)
+        registry.inc("ai_tokens_total", (("model", model), ("kind", "completion")), usage.completion_tokens or 0)
+
+
+def instrument(app):
+    """Time every request and template render in app."""
+    from flask import g, request, before_render_template, template_rendered
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(resp):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            registry.observe("http_request_duration_seconds", time.perf_counter() - start, (("route", route),))
+            registry.inc("http_requests_total",
+                         (("route", route), ("method", request.method), ("status", resp.status_code)))
+        return resp
+
+    def _render_started(sender, template, context, **extra):
+        context["_render_start"] = time.perf_counter()
+
+    def _render_done(sender, template, context, **extra):
+        start = context.get("_render_start")
+        if start is not None:
+            registry.observe("template_render_seconds", time.perf_counter() - start,
+                             (("template", template.name),))
+
+    before_render_template.connect(_render_started, app, weak=False)
+    template_rendered.connect(_render_done, app, weak=False)
@@ -0,0 +1,125 @@
+"""The shared OpenAI client and the policy around calling it.
+
+One client per process keeps a pool of keep-alive connections instead of
+paying a TLS handshake per request. The openai package is imported with
+that client, on the first AI call, so workers boot and answer /health
+without paying for it. Calls get bounded timeouts, jittered
+retries on 429/5xx/connection errors, and a circuit breaker that fails fast
+with UpstreamUnavailable while OpenAI is degraded. How many calls may run
+at once is decided in services.governor.
+"""
+import os, random, threading, time
+
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_READ_TIMEOUT    = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES     = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+BREAKER_THRESHOLD      = int(os.getenv("OPENAI_BREAKER_THRESHOLD", "5"))   # consecutive failures
+BREAKER_COOLDOWN       = float(os.getenv("OPENAI_BREAKER_COOLDOWN", "30")) # seconds open
+
+
+class UpstreamUnavailable(Exception):
+    """OpenAI is failing or the breaker is open; shown to users as-is."""
+
+    def __init__(self, message="The AI service is having trouble right now. Please try again in a minute."):
+        super().__init__(message)
+        self.message = message
+
+
+class CircuitBreaker:
+    """Open after N consecutive failures; let one trial call through after a cooldown."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.cooldown or self.trial_running:
+                raise UpstreamUnavailable()
+            self.trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide OpenAI client (created on first use)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI, Timeout
+                # The SDK's HTTP client keeps a keep-alive pool; retries are
+                # ours (below) so they can feed the breaker.
+                _client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    timeout=Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+                    max_retries=0,
+                )
+    return _client
+
+
+def _retryable(e):
+    from openai import APIConnectionError, APIStatusError   # already loaded by get_client()
+    if isinstance(e, APIConnectionError):   # includes timeouts
+        return True
+    return isinstance(e, APIStatusError) and (e.status_code == 429 or e.status_code >= 500)
+
+def _backoff(attempt, e):
+    retry_after = getattr(getattr(e, "response", None), "headers", {}).get("retry-after")
+    try:
+        return min(float(retry_after), 10.0)
+    except (TypeError, ValueError):
+        return random.uniform(0, min(8.0, 0.5 * 2 ** attempt))   # full jitter
+
+def call_openai(fn):
+    """Run fn(client) under the retry policy and circuit breaker.
+
+    Retryable failures that outlast the retries (and calls made while the
+    breaker is open) raise UpstreamUnavailable; other API errors such as a
+    bad request propagate unchanged.
+    """
+    breaker.before_call()
+    client = get_client()
+    for attempt in range(OPENAI_MAX_RETRIES + 1):
+        try:
+            result = fn(client)
+        except Exception as e:
+            if not _retryable(e):
+                breaker.record_success()
+                raise
+            if attempt == OPENAI_MAX_RETRIES:
+                breaker.record_failure()
+                print("⚠️ OpenAI call failed after retries:", e)
+                raise UpstreamUnavailable() from e
+            time.sleep(_backoff(attempt, e))
+        else:
+            breaker.record_success()
+            return result
@@ -0,0 +1,120 @@
+"""Speculative prefetch of Prompt Builder question explanations.
+
+When the builder asks a clarifying question, the "why is this asked?"
+explanation is often requested next. With PB_PREFETCH=1 it is started on a
+small thread pool as soon as the question is produced and parked under
+(conversation, question). /explain_question then takes the finished answer,
+or joins the call still in flight, instead of starting a second one.
+
+At most PB_PREFETCH_MAX_INFLIGHT speculative calls run or wait at once;
+beyond that new prefetches are skipped rather than queued, so speculation
+never competes with real requests for long, and the calls themselves run
+at the governor's speculative priority. Each conversation keeps only the
+prefetch for its latest question.
+"""
+import hashlib, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from app.services.metrics import registry
+from app.services.governor import governor, request_session_key
+
+PB_PREFETCH              = os.getenv("PB_PREFETCH", "0") == "1"
+PB_PREFETCH_WORKERS      = int(os.getenv("PB_PREFETCH_WORKERS", "4"))
+PB_PREFETCH_MAX_INFLIGHT = int(os.getenv("PB_PREFETCH_MAX_INFLIGHT", "8"))
+PB_PREFETCH_TTL          = int(os.getenv("PB_PREFETCH_TTL", "900"))       # seconds an unused result is kept
+PB_PREFETCH_JOIN_TIMEOUT = float(os.getenv("PB_PREFETCH_JOIN_TIMEOUT", "60"))
+
+registry.counter("pb_prefetch_total",
+                 "Speculative explanation prefetches by outcome (started, skipped, used, wasted, failed).")
+
+
+class Prefetcher:
+    def __init__(self, enabled=PB_PREFETCH, workers=PB_PREFETCH_WORKERS,
+                 max_inflight=PB_PREFETCH_MAX_INFLIGHT, ttl=PB_PREFETCH_TTL):
+        self.enabled = enabled
+        self.workers = workers
+        self.ttl = ttl
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._entries = {}   # conversation -> (question hash, started_at, future)
+        self._lock = threading.Lock()
+
+    def submit(self, convo, question, fn):
+        """Start fn() for (convo, question) unless disabled, duplicate or at the cap."""
+        if not self.enabled or not convo:
+            return False
+        key = _digest(question)
+        with self._lock:
+            entry = self._entries.get(convo)
+            if entry and entry[0] == key:
+                return False
+        if not self._slots.acquire(blocking=False):
+            _count("skipped")
+            return False
+        future = self._executor().submit(self._run, fn, request_session_key())
+        with self._lock:
+            old = self._entries.get(convo)
+            self._entries[convo] = (key, time.time(), future)
+            self._expire()
+        if old:
+            _count("wasted")
+        _count("started")
+        return True
+
+    def take(self, convo, question, timeout=PB_PREFETCH_JOIN_TIMEOUT):
+        """Return the prefetched result for (convo, question), or None to compute it normally."""
+        if not self.enabled or not convo:
+            return None
+        key = _digest(question)
+        with self._lock:
+            entry = self._entries.get(convo)
+            if not entry or entry[0] != key or time.time() - entry[1] > self.ttl:
+                return None
+            del self._entries[convo]
+        state = "ready" if entry[2].done() else "inflight"
+        try:
+            result = entry[2].result(timeout)
+        except Exception as e:
+            print("⚠️ Prefetched explanation failed:", e)
+            _count("failed")
+            return None
+        _count("used", state)
+        return result
+
+    def discard(self, convo):
+        """Forget the prefetch for a conversation that was reset or ended."""
+        with self._lock:
+            entry = self._entries.pop(convo, None)
+        if entry:
+            _count("wasted")
+
+    def _run(self, fn, session_key):
+        try:
+            with governor.speculative(), governor.acting_for(session_key):
+                return fn()
+        finally:
+            self._slots.release()
+
+    def _executor(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="pb-prefetch")
+        return self._pool
+
+    def _expire(self):
+        now = time.time()
+        stale = [c for c, (_, started, _) in self._entries.items() if now - started > self.ttl]
+        for c in stale:
+            del self._entries[c]
+            _count("wasted")
+
+
+def _digest(text):
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+def _count(outcome, state=None):
+    labels = (("outcome", outcome),) + ((("state", state),) if state else ())
+    registry.inc("pb_prefetch_total", labels)
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,39 @@
+"""Message builders shared by the live routes and the offline catalogue.
+
+Keeping one copy means a precomputed lesson or troubleshooting guide is
+generated from exactly the prompt the live route would have sent.
+"""
+
+
+def lesson_messages(app_name):
+    return [
+        {"role": "system", "content": (
+            "You are a Microsoft 365 tutor. "
+            "When asked about an app, explain it step-by-step in a simple 'for dummies' style. "
+            "Keep it friendly, beginner-focused, and clear."
+        )},
+        {"role": "user", "content": f"Teach me the basics of {app_name}. Explain step by step."}
+    ]
+
+def troubleshoot_messages(app_name, problem):
+    return [
+        {"role": "system", "content": (
+            "You are a helpful Microsoft 365 troubleshooter. "
+            "Given an app name and a problem, respond in plain language with clear, numbered steps. "
+            "Keep it beginner-friendly, like a 'for dummies' guide. "
+            "Avoid markdown symbols like *, **, or colons. "
+            "Format steps as 'Step Title - explanation'. "
+            "If the problem looks network-related, advise the user to contact TVA IT support."
+        )},
+        {"role": "user", "content": f"App: {app_name}\nProblem: {problem}"}
+    ]
+
+def common_issues_messages(app_name, count):
+    return [
+        {"role": "system", "content": (
+            "You support beginner Microsoft 365 users at a large organisation. "
+            "List problems exactly as a user would describe them, one per line, "
+            "with no numbering, headings or extra text."
+        )},
+        {"role": "user", "content": f"List the {count} most common problems people ask for help with in {app_name}."}
+    ]
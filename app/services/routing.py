@@ -0,0 +1,55 @@
+"""Which model, temperature and token limit each AI call site uses.
+
+Chatty, low-stakes calls (clarifying questions, explanations, summaries)
+default to a fast model; the answers users keep (final prompts,
+troubleshooting steps, lessons) stay on the strong one. Any site can be
+overridden with AI_MODEL_<SITE>, AI_TEMPERATURE_<SITE> and
+AI_MAX_TOKENS_<SITE>, e.g. AI_MODEL_CLARIFY=gpt-4o.
+
+When a final answer from a cheaper model comes back without the
+===COPILOT PROMPT=== / ===MANUAL STEPS=== sections, escalation_route()
+names the strong model to retry it on (AI_ESCALATE=0 turns that off).
+"""
+import os
+from collections import namedtuple
+
+Route = namedtuple("Route", "model temperature max_tokens")
+
+AI_STRONG_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+AI_FAST_MODEL   = os.getenv("AI_FAST_MODEL", "gpt-4o-mini")
+AI_ESCALATE     = os.getenv("AI_ESCALATE", "1") == "1"
+
+_DEFAULTS = {
+    "clarify":      Route(AI_FAST_MODEL, None, None),    # pb_start / pb_reply questions
+    "finalize":     Route(AI_STRONG_MODEL, None, None),  # pb_finalize
+    "explain":      Route(AI_FAST_MODEL, None, 500),     # explain_prompt / explain_question
+    "troubleshoot": Route(AI_STRONG_MODEL, None, None),  # ask_help
+    "teach":        Route(AI_STRONG_MODEL, None, None),  # teach_me
+    "summarize":    Route(AI_FAST_MODEL, 0, 400),        # context trimming summaries
+    "assist":       Route(os.getenv("DEFAULT_MODEL", "gpt-4o-mini"), 0.3, None),   # /ask_gpt blueprint
+}
+
+
+def _from_env(site, default):
+    name = site.upper()
+    temperature = os.getenv(f"AI_TEMPERATURE_{name}")
+    max_tokens = os.getenv(f"AI_MAX_TOKENS_{name}")
+    return Route(
+        os.getenv(f"AI_MODEL_{name}") or default.model,
+        default.temperature if temperature is None else (float(temperature) if temperature else None),
+        default.max_tokens if max_tokens is None else (int(max_tokens) if max_tokens else None),
+    )
+
+ROUTES = {site: _from_env(site, default) for site, default in _DEFAULTS.items()}
+
+
+def route(site):
+    """Return the Route for a call site (the strong model with API defaults if unknown)."""
+    return ROUTES.get(site) or Route(AI_STRONG_MODEL, None, None)
+
+def escalation_route(site):
+    """Route to retry a malformed final answer from site on, or None if there is nowhere to go."""
+    if not AI_ESCALATE or route(site).model == AI_STRONG_MODEL:
+        return None
+    finalize = route("finalize")
+    return Route(AI_STRONG_MODEL, finalize.temperature, finalize.max_tokens)
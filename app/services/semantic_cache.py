@@ -0,0 +1,241 @@
+"""Reuse Troubleshooter answers for problems worded differently.
+
+The exact-match response cache misses when two users describe the same
+problem with different words. Here each problem is turned into a hashed
+TF-IDF vector (word unigrams and bigrams, feature hashing into a fixed
+NumPy vector), and each app keeps a small matrix of past problems and the
+steps they produced. A new problem whose cosine similarity to a stored one
+reaches ASK_HELP_REUSE_THRESHOLD gets the stored steps instead of a model
+call. With ASK_HELP_REUSE_DB set, entries live in SQLite as well, so every
+worker can reuse them and they survive restarts.
+
+The similarity of the best match is recorded on every lookup, hit or miss,
+as the ask_help_reuse_similarity histogram; use it to tune the threshold.
+"""
+import importlib.util, json, os, re, sqlite3, threading, time, zlib
+from app.services.blocking import offload
+from app.services.metrics import registry
+
+# numpy is optional (without it every lookup is a miss) and imported on
+# first use, so it costs nothing at worker start.
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+np = None
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+ASK_HELP_REUSE           = os.getenv("ASK_HELP_REUSE", "1") == "1"
+ASK_HELP_REUSE_THRESHOLD = float(os.getenv("ASK_HELP_REUSE_THRESHOLD", "0.8"))   # cosine similarity
+ASK_HELP_REUSE_MAX       = int(os.getenv("ASK_HELP_REUSE_MAX", "1000"))           # entries per app
+ASK_HELP_REUSE_TTL       = int(os.getenv("ASK_HELP_REUSE_TTL", str(30 * 86400)))  # seconds
+ASK_HELP_REUSE_DB        = os.getenv("ASK_HELP_REUSE_DB", "")                     # e.g. prompt_log/ask_help.db
+HASH_DIM = 1024
+
+SIMILARITY_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0)
+registry.counter("ask_help_reuse_total", "Troubleshooter lookups by outcome (hit, miss).")
+registry.histogram("ask_help_reuse_similarity", "Best stored-problem similarity per Troubleshooter lookup.",
+                   SIMILARITY_BUCKETS)
+
+_STOPWORDS = set("""
+a after all also an and any are as at be but by can cant could do does doesnt dont for from get gets
+getting had has have how i im in is isnt it its just keep keeps me my no not of on or so some still that
+the their them then there this to too trying up was wasnt we what when whenever where which while why
+will with wont would you your
+""".split())
+_WORD = re.compile(r"[a-z0-9#+]+(?:'[a-z]+)?")
+
+
+def _stem(word):
+    """Crude suffix stripping so crash/crashes/crashing/crashed share a feature."""
+    if word.endswith("ing") and len(word) >= 6:
+        word = _undouble(word[:-3])
+    elif word.endswith("ed") and len(word) >= 5:
+        word = _undouble(word[:-2])
+    elif word.endswith("es") and word[:-2].endswith(("s", "x", "z", "ch", "sh")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss") and len(word) >= 4:
+        word = word[:-1]
+    if word.endswith("e") and len(word) >= 4:
+        word = word[:-1]
+    return word
+
+def _undouble(word):
+    if len(word) >= 4 and word[-1] == word[-2] and word[-1] not in "aeiouls":
+        return word[:-1]   # cutting -> cut, dropped -> drop
+    return word
+
+def tokens(text):
+    """Lowercased, stop-word-free, lightly stemmed words of text."""
+    words = (w.replace("'", "") for w in _WORD.findall(text.lower()))
+    return [_stem(w) for w in words if w not in _STOPWORDS]
+
+def term_vector(text):
+    """Sublinear term frequencies of text's unigrams and bigrams, hashed into HASH_DIM.
+
+    Bigrams count half, so word order nudges the score without dominating it.
+    """
+    words = tokens(text)
+    features = [(w, 1.0) for w in words] + [(f"{a} {b}", 0.5) for a, b in zip(words, words[1:])]
+    vec = np.zeros(HASH_DIM, dtype=np.float32)
+    for f, weight in features:
+        h = zlib.crc32(f.encode("utf-8"))
+        vec[h % HASH_DIM] += weight if h & 0x80000000 else -weight   # signed hashing evens out collisions
+    return np.sign(vec) * np.log1p(np.abs(vec))
+
+
+class _AppIndex:
+    """Past problems for one app: raw term vectors plus the steps served."""
+
+    def __init__(self):
+        self.vectors = np.zeros((0, HASH_DIM), dtype=np.float32)
+        self.created = np.zeros(0)
+        self.steps = []
+        self.df = np.zeros(HASH_DIM, dtype=np.float32)   # documents with each feature
+        self._weighted = None                             # normalised TF-IDF rows, rebuilt when dirty
+
+    def add(self, vec, steps, created):
+        if len(self.steps) >= ASK_HELP_REUSE_MAX:
+            self.df -= self.vectors[0] != 0
+            self.vectors, self.created, self.steps = self.vectors[1:], self.created[1:], self.steps[1:]
+        self.vectors = np.vstack([self.vectors, vec])
+        self.created = np.append(self.created, created)
+        self.steps.append(steps)
+        self.df += vec != 0
+        self._weighted = None
+
+    def best(self, vec, now):
+        """Return (row, similarity) of the closest live entry, or (None, 0.0)."""
+        if not self.steps:
+            return None, 0.0
+        idf = np.log((1 + len(self.steps)) / (1 + self.df)) + 1
+        if self._weighted is None:
+            w = self.vectors * idf
+            norms = np.linalg.norm(w, axis=1, keepdims=True)
+            self._weighted = w / np.where(norms == 0, 1, norms)
+        q = vec * idf
+        qn = np.linalg.norm(q)
+        if qn == 0:
+            return None, 0.0
+        sims = self._weighted @ (q / qn)
+        sims[now - self.created > ASK_HELP_REUSE_TTL] = -1
+        row = int(np.argmax(sims))
+        return row, float(max(sims[row], 0.0))
+
+
+class SemanticCache:
+    def __init__(self, threshold=ASK_HELP_REUSE_THRESHOLD, path=ASK_HELP_REUSE_DB):
+        self.threshold = threshold
+        self.path = path or None
+        self.enabled = ASK_HELP_REUSE and HAVE_NUMPY
+        self.hits = 0
+        self.misses = 0
+        self._apps = {}
+        self._seeded = set()
+        self._pending_seeds = []
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.enabled and self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db().execute("""CREATE TABLE IF NOT EXISTS answers (
+                id      INTEGER PRIMARY KEY,
+                app     TEXT NOT NULL,
+                problem TEXT NOT NULL,
+                steps   TEXT NOT NULL,
+                created REAL NOT NULL
+            )""")
+
+    def lookup(self, app, problem):
+        """Return (steps, similarity); steps is None when nothing is close enough."""
+        if not self.enabled:
+            return None, 0.0
+        _load_numpy()
+        vec = term_vector(problem)
+        self._sync()
+        with self._lock:
+            self._apply_seeds()
+            index = self._apps.get(app.lower())
+            row, sim = index.best(vec, time.time()) if index else (None, 0.0)
+            hit = row is not None and sim >= self.threshold
+            steps = list(index.steps[row]) if hit else None
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        registry.inc("ask_help_reuse_total", (("outcome", "hit" if hit else "miss"),))
+        registry.observe("ask_help_reuse_similarity", sim)
+        return steps, sim
+
+    def add(self, app, problem, steps):
+        """Remember the steps the model gave for problem."""
+        if not self.enabled or not steps:
+            return
+        _load_numpy()
+        now = time.time()
+        if self.path:
+            offload(self._insert, app.lower(), problem, json.dumps(steps), now)
+            self._sync()
+        else:
+            with self._lock:
+                self._apps.setdefault(app.lower(), _AppIndex()).add(term_vector(problem), steps, now)
+
+    def seed(self, app, problem, steps):
+        """Add a known answer (e.g. from the catalogue) to this process only, once.
+
+        Seeds are vectorised at the next lookup, keeping startup cheap.
+        """
+        if not self.enabled or not steps:
+            return
+        with self._lock:
+            if (app.lower(), problem) not in self._seeded:
+                self._seeded.add((app.lower(), problem))
+                self._pending_seeds.append((app.lower(), problem, steps, time.time()))
+
+    def _apply_seeds(self):
+        for app, problem, steps, created in self._pending_seeds:
+            self._apps.setdefault(app, _AppIndex()).add(term_vector(problem), steps, created)
+        self._pending_seeds = []
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0,
+                    "entries": sum(len(i.steps) for i in self._apps.values()) + len(self._pending_seeds)}
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def _insert(self, app, problem, steps, created):
+        with self._db() as db:
+            db.execute("INSERT INTO answers (app, problem, steps, created) VALUES (?, ?, ?, ?)",
+                       (app, problem, steps, created))
+
+    def _fetch(self, after_id, since):
+        return self._db().execute(
+            "SELECT id, app, problem, steps, created FROM answers WHERE id > ? AND created > ? ORDER BY id",
+            (after_id, since)).fetchall()
+
+    def _sync(self):
+        """Load entries other workers (or earlier runs) have added since the last sync."""
+        if not self.path:
+            return
+        rows = offload(self._fetch, self._last_id, time.time() - ASK_HELP_REUSE_TTL)
+        if not rows:
+            return
+        with self._lock:
+            for row_id, app, problem, steps, created in rows:
+                if row_id > self._last_id:
+                    self._apps.setdefault(app, _AppIndex()).add(term_vector(problem), json.loads(steps), created)
+                    self._last_id = row_id
+
+
+ask_help_cache = SemanticCache()
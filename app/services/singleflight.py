@@ -0,0 +1,49 @@
+"""Collapse concurrent identical calls into one.
+
+When a training session starts, many people ask for the same lesson at
+once. The first caller for a key runs the function; everyone who arrives
+while it is still in flight waits for that result instead of starting
+their own upstream request.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    def __init__(self):
+        self.leaders = 0     # calls that actually ran
+        self.collapsed = 0   # calls that piggy-backed on one already running
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Return fn(), sharing one execution among concurrent callers of key."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+                self.leaders += 1
+            else:
+                self.collapsed += 1
+        if not leader:
+            return fut.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"leaders": self.leaders, "collapsed": self.collapsed, "inflight": len(self._inflight)}
+
+
+flight = SingleFlight()
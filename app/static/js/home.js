@@ -0,0 +1,16 @@
+const modal = document.getElementById("disclaimer-modal");
+const link = document.getElementById("disclaimer-info");
+const closeBtn = document.querySelector(".close");
+
+link.addEventListener("click", function(e) {
+  e.preventDefault();
+  modal.style.display = "block";
+});
+closeBtn.addEventListener("click", function() {
+  modal.style.display = "none";
+});
+window.addEventListener("click", function(e) {
+  if (e.target === modal) {
+    modal.style.display = "none";
+  }
+});
@@ -0,0 +1,218 @@
+function showThinking(show) {
+  document.getElementById("thinking").classList.toggle("hidden", !show);
+}
+
+function addMessage(role, text) {
+  const box = document.getElementById("chat-box");
+  const div = document.createElement("div");
+  div.className = "chat-message " + role;
+  div.textContent = text;
+  box.appendChild(div);
+  box.scrollTop = box.scrollHeight;
+  return div;
+}
+
+// POST and read the NDJSON token stream; onEvent gets each parsed line.
+async function streamPost(url, body, onEvent) {
+  const res = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", "Accept": "application/x-ndjson" },
+    body: JSON.stringify(body || {})
+  });
+  if (!res.ok || !res.body) {
+    onEvent(Object.assign({ done: true }, await res.json().catch(() => ({}))));
+    return;
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buf.indexOf("\n")) >= 0) {
+      const line = buf.slice(0, nl).trim();
+      buf = buf.slice(nl + 1);
+      if (line) onEvent(JSON.parse(line));
+    }
+  }
+  if (buf.trim()) onEvent(JSON.parse(buf));
+}
+
+function showFinal() {
+  document.getElementById("question-section").style.display = "none";
+  document.getElementById("final-section").style.display = "block";
+}
+
+// Streams one assistant turn into the chat, switching to the final
+// section as soon as the Copilot prompt starts arriving.
+async function streamTurn(url, body, section) {
+  let bubble = null;
+  const finalPrompt = document.getElementById("final-prompt");
+  const manualSteps = document.getElementById("manual-steps");
+  if (section === "copilot") {
+    finalPrompt.textContent = "";
+    manualSteps.textContent = "";
+    showFinal();
+  }
+
+  await streamPost(url, body, (ev) => {
+    showThinking(false);
+    if (ev.delta !== undefined) {
+      if (ev.section === "reply") {
+        bubble = bubble || addMessage("ai", "");
+        bubble.textContent += ev.delta;
+        const box = document.getElementById("chat-box");
+        box.scrollTop = box.scrollHeight;
+      } else {
+        if (section !== "copilot") {
+          section = "copilot";
+          finalPrompt.textContent = "";
+          manualSteps.textContent = "";
+          showFinal();
+        }
+        (ev.section === "manual" ? manualSteps : finalPrompt).textContent += ev.delta;
+      }
+      return;
+    }
+    if (ev.error && section === "copilot") {
+      // The question section is hidden by now, so report it where the prompt was going.
+      if (bubble) bubble.remove();
+      finalPrompt.textContent = "⚠️ " + ev.error;
+      manualSteps.textContent = "";
+    } else if (ev.error) {
+      (bubble || addMessage("ai", "")).textContent = "⚠️ " + ev.error;
+    } else if (ev.finalized || ev.copilot !== undefined) {
+      if (bubble) bubble.remove();
+      showFinal();
+      finalPrompt.textContent = ev.copilot || "⚠️ No Copilot prompt generated.";
+      manualSteps.textContent = ev.manual || "⚠️ No manual steps available.";
+    } else if (ev.reply) {
+      bubble = bubble || addMessage("ai", "");
+      bubble.textContent = ev.reply;
+      addExplainButton(bubble, ev.reply);
+    }
+  });
+  showThinking(false);
+}
+
+// "Why is this asked?" link under a clarifying question. The server
+// usually has the explanation prefetched by the time it is clicked.
+function addExplainButton(bubble, question) {
+  const btn = document.createElement("button");
+  btn.className = "btn-explain-q";
+  btn.textContent = "🤔 Why is this asked?";
+  const box = document.createElement("div");
+  box.className = "explain-box";
+  btn.onclick = async () => {
+    btn.disabled = true;
+    box.style.display = "block";
+    box.innerHTML = "<em>🤖 Explaining this question...</em>";
+    try {
+      const res = await fetch("/explain_question", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ question })
+      });
+      const data = await res.json();
+      box.textContent = data.explanation || ("⚠️ " + (data.error || "Sorry — could not generate explanation."));
+      box.classList.add("fade-in");
+    } catch (e) {
+      box.textContent = "⚠️ Error contacting server. Try again.";
+    }
+    btn.disabled = false;
+  };
+  bubble.after(btn, box);
+}
+
+async function startBuilder() {
+  const app = document.getElementById("app").value.trim();
+  const goal = document.getElementById("goal").value.trim();
+  if (!app || !goal) {
+    alert("Please select an app and enter a goal.");
+    return;
+  }
+
+  document.getElementById("start-section").style.display = "none";
+  document.getElementById("question-section").style.display = "block";
+
+  showThinking(true);
+  await streamTurn("/pb_start", { app, goal }, "reply");
+}
+
+async function sendAnswer() {
+  const answer = document.getElementById("answer").value.trim();
+  if (!answer) return;
+  addMessage("user", answer);
+  document.getElementById("answer").value = "";
+  showThinking(true);
+  await streamTurn("/pb_reply", { message: answer }, "reply");
+}
+
+async function finalizePrompt() {
+  showThinking(true);
+  await streamTurn("/pb_finalize", {}, "copilot");
+}
+
+async function explainPrompt() {
+  const prompt = document.getElementById("final-prompt").innerText.trim();
+  if (!prompt) {
+    alert("No prompt available to explain.");
+    return;
+  }
+  const box = document.getElementById("explain-box");
+  box.style.display = "block";
+  box.innerHTML = "<em>🤖 Explaining why this prompt works...</em>";
+
+  try {
+    const res = await fetch("/explain_prompt", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ prompt })
+    });
+    const data = await res.json();
+    if (data.explanation) {
+      box.innerHTML = `
+        <h4>🔎 Prompt Explanation</h4>
+        <div>
+          ${data.explanation
+            .replace(/\*\*(.*?)\*\*/g, "<strong>$1</strong>")
+            .replace(/[-•]\s/g, "<br>• ")
+            .replace(/\n/g, "<br>")}
+        </div>
+      `;
+      box.classList.add("fade-in");
+    } else {
+      box.textContent = "⚠️ Sorry — could not generate explanation.";
+    }
+  } catch (e) {
+    box.textContent = "⚠️ Error contacting server. Try again.";
+  }
+}
+
+function copyPrompt() {
+  const promptText = document.getElementById("final-prompt").innerText;
+  navigator.clipboard.writeText(promptText).then(() => {
+    alert("✅ Copilot prompt copied to clipboard!");
+  });
+}
+
+function resetBuilder() {
+  if (!confirm("Start over and clear this session?")) return;
+  document.getElementById("start-section").style.display = "block";
+  document.getElementById("question-section").style.display = "none";
+  document.getElementById("final-section").style.display = "none";
+  document.getElementById("chat-box").innerHTML = "";
+  document.getElementById("app").value = "";
+  document.getElementById("goal").value = "";
+  showThinking(false);
+
+  const explainBox = document.getElementById("explain-box");
+  if (explainBox) {
+    explainBox.style.display = "none";
+    explainBox.textContent = "";
+  }
+
+  window.scrollTo({ top: 0, behavior: "smooth" });
+}
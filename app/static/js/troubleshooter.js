@@ -0,0 +1,3 @@
+window.onload = function () {
+    document.getElementById("main-content").scrollIntoView({ behavior: "smooth" });
+};
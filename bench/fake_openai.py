@@ -0,0 +1,159 @@
+"""A local stand-in for the OpenAI chat completions API.
+
+Run it directly for manual testing:
+
+    python bench/fake_openai.py --port 8999 --latency 0.8 --token-rate 60
+    OPENAI_BASE_URL=http://127.0.0.1:8999/v1 OPENAI_API_KEY=fake flask --app wsgi run
+
+or let bench/loadtest.py start it in-process. Replies are shaped like the
+real ones the app expects: clarifying questions while building a prompt,
+===COPILOT PROMPT=== / ===MANUAL STEPS=== sections when asked to finalize,
+and numbered steps or a lesson otherwise.
+"""
+import argparse, json, random, threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FILLER = ("open the app and look for the option in the ribbon then follow the prompts "
+          "carefully and save your work before closing ").split()
+
+
+class FakeOpenAI:
+    """Behaviour knobs shared by every request the server handles."""
+
+    def __init__(self, latency=0.5, token_rate=50.0, reply_tokens=120, error_rate=0.0, error_status=500):
+        self.latency = latency            # seconds before the first token
+        self.token_rate = token_rate      # tokens per second after that (0 = instant)
+        self.reply_tokens = reply_tokens  # length of lessons / step lists
+        self.error_rate = error_rate      # fraction of requests answered with error_status
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def reply_for(self, messages):
+        last = messages[-1]["content"] if messages else ""
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        if "Finalize now" in last:
+            return ("===COPILOT PROMPT===\nDraft a short, friendly project update email for my supervisor "
+                    "covering progress, risks and next steps.\n\n"
+                    "===MANUAL STEPS===\n1. Open Outlook and select New Email.\n"
+                    "2. Add your supervisor in the To line.\n3. Write three short paragraphs.\n"
+                    "4. Proofread and select Send.")
+        if "Copilot prompts" in system and "Ask smart" in system:
+            return "Who will read this, and what tone would you like (formal, friendly, brief)?"
+        words = [random.choice(FILLER) for _ in range(self.reply_tokens)]
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        return "\n".join(f"{n}. Step {n} - {line}" for n, line in enumerate(lines, 1))
+
+    def record(self, messages, text, failed=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+            self.prompt_tokens += sum(len(m.get("content", "")) // 4 + 4 for m in messages)
+            self.completion_tokens += len(text.split())
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors,
+                    "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._json(404, {"error": {"message": "not found"}})
+            messages = body.get("messages", [])
+            model = body.get("model", "gpt-4o")
+            time.sleep(fake.latency)
+
+            if random.random() < fake.error_rate:
+                fake.record(messages, "", failed=True)
+                return self._json(fake.error_status, {"error": {"message": "injected failure", "type": "server_error"}})
+
+            text = fake.reply_for(messages)
+            fake.record(messages, text)
+            tokens = text.split(" ")
+            delay = 1.0 / fake.token_rate if fake.token_rate else 0
+            usage = {"prompt_tokens": sum(len(m.get("content", "")) // 4 + 4 for m in messages),
+                     "completion_tokens": len(tokens)}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+            if not body.get("stream"):
+                time.sleep(delay * len(tokens))
+                return self._json(200, {
+                    "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                    "model": model, "usage": usage,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": text}}],
+                })
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, tok in enumerate(tokens):
+                chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [{"index": 0, "finish_reason": None,
+                                                      "delta": {"content": tok if i == 0 else " " + tok}}]}
+                self._chunk(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+                time.sleep(delay)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                tail = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model, "choices": [], "usage": usage}
+                self._chunk(b"data: " + json.dumps(tail).encode() + b"\n\n")
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+
+        def _chunk(self, data):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(fake, host="127.0.0.1", port=0):
+    """Start the fake API on a daemon thread; return (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=8999)
+    ap.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    ap.add_argument("--token-rate", type=float, default=50, help="tokens per second (0 = instant)")
+    ap.add_argument("--reply-tokens", type=int, default=120)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--error-status", type=int, default=500)
+    args = ap.parse_args()
+    fake = FakeOpenAI(args.latency, args.token_rate, args.reply_tokens, args.error_rate, args.error_status)
+    server, url = serve(fake, port=args.port)
+    print(f"Fake OpenAI listening on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
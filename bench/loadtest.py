@@ -0,0 +1,266 @@
+"""Load test the app against a fake OpenAI server. No API key or spend needed.
+
+    python bench/loadtest.py --users 50 --duration 30
+    python bench/loadtest.py --worker-class sync --workers 4 --stream
+    python bench/loadtest.py --mix pb=1 --latency 2 --json bench_output.json
+
+The script starts bench/fake_openai.py in-process and starts gunicorn on
+wsgi:app with OPENAI_BASE_URL pointed at the fake. Virtual users then loop
+through weighted scenarios until the duration runs out:
+
+  login      GET / then POST the password
+  pb         /pb_start -> /pb_reply x N -> /pb_finalize
+  ask_help   Troubleshooter form post
+  teach_me   lesson form post
+
+For each step it reports p50/p95/p99 latency, requests/sec and errors. It
+also reports worker saturation: requests in flight compared with serving
+capacity, plus a /health probe that shows queuing behind busy workers.
+"""
+import argparse, http.cookiejar, json, os, random, signal, socket, statistics
+import subprocess, sys, tempfile, threading, time, urllib.error, urllib.parse, urllib.request
+from collections import defaultdict
+
+from fake_openai import FakeOpenAI, serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "bench-password"
+APPS = ["Word", "Excel", "Outlook", "Teams", "PowerPoint"]
+PROBLEMS = [
+    "My document will not save to OneDrive",
+    "Meeting audio keeps cutting out",
+    "Shared mailbox is not showing up",
+    "Formulas show #VALUE! after I paste data",
+    "Slides lose their formatting when I present",
+]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)   # step -> [seconds]
+        self.errors = defaultdict(int)
+        self.inflight = 0
+        self.inflight_samples = []
+        self.health = []
+        self._lock = threading.Lock()
+
+    def timed(self, step, fn):
+        with self._lock:
+            self.inflight += 1
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            with self._lock:
+                self.errors[step] += 1
+            return None
+        finally:
+            with self._lock:
+                self.inflight -= 1
+        with self._lock:
+            self.samples[step].append(time.perf_counter() - start)
+        return result
+
+
+class User:
+    """One browser: a cookie jar plus the scenarios it can run."""
+
+    def __init__(self, base, rec, stream, replies):
+        self.base, self.rec, self.stream, self.replies = base, rec, stream, replies
+        jar = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+
+    def _send(self, path, form=None, json_body=None, headers=None):
+        data, hdrs = None, dict(headers or {})
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+        elif json_body is not None:
+            data = json.dumps(json_body).encode()
+            hdrs["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.base + path, data=data, headers=hdrs)
+        with self.opener.open(req, timeout=300) as resp:
+            body = resp.read()
+            if resp.status >= 400:
+                raise urllib.error.HTTPError(req.full_url, resp.status, "", resp.headers, None)
+            return body
+
+    def _pb(self, step, path, body):
+        headers = {"Accept": "application/x-ndjson"} if self.stream else {}
+
+        def call():
+            out = self._send(path, json_body=body, headers=headers)
+            # Streams always answer 200; failures arrive as a final error event.
+            if self.stream and b'"error"' in out.rstrip().rsplit(b"\n", 1)[-1]:
+                raise RuntimeError("stream ended with an error event")
+            return out
+        return self.rec.timed(step, call)
+
+    def login(self):
+        self.rec.timed("login", lambda: (self._send("/"), self._send("/", form={"password": PASSWORD})))
+
+    def pb(self):
+        app = random.choice(APPS)
+        self._pb("pb_start", "/pb_start", {"app": app, "goal": f"Write a project update in {app}"})
+        for i in range(self.replies):
+            self._pb("pb_reply", "/pb_reply", {"message": f"Answer {i}: keep it friendly and short"})
+        self._pb("pb_finalize", "/pb_finalize", {})
+
+    def ask_help(self):
+        form = {"app": random.choice(APPS), "problem": random.choice(PROBLEMS)}
+        self.rec.timed("ask_help", lambda: self._send("/ask_help", form=form))
+
+    def teach_me(self):
+        self.rec.timed("teach_me", lambda: self._send("/teach_me", form={"app": random.choice(APPS)}))
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(args, api_url, workdir):
+    port = free_port()
+    env = dict(os.environ,
+               OPENAI_BASE_URL=api_url, OPENAI_API_KEY="fake", APP_PASSWORD=PASSWORD,
+               SECRET_KEY="bench", GUNICORN_WORKER_CLASS=args.worker_class,
+               WEB_CONCURRENCY=str(args.workers), CONVO_DB=os.path.join(workdir, "convos.db"))
+    cmd = [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+           "--pythonpath", ROOT, "-b", f"127.0.0.1:{port}", "wsgi:app"]
+    # The app writes prompt_log/ relative to the cwd, so run it in workdir to keep bench rows out of the repo.
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base + "/health", timeout=1).read()
+            return proc, base
+        except OSError:
+            if proc.poll() is not None:
+                sys.exit("gunicorn exited:\n" + proc.stderr.read().decode(errors="replace"))
+            time.sleep(0.2)
+    proc.kill()
+    sys.exit("gunicorn did not answer /health within 30s")
+
+
+def probe(base, rec, stop):
+    """Sample in-flight requests and /health latency twice a second."""
+    while not stop.is_set():
+        with rec._lock:
+            rec.inflight_samples.append(rec.inflight)
+        start = time.perf_counter()
+        try:
+            urllib.request.urlopen(base + "/health", timeout=30).read()
+            rec.health.append(time.perf_counter() - start)
+        except OSError:
+            rec.errors["health"] += 1
+        stop.wait(0.5)
+
+
+def pct(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def report(rec, fake, args, elapsed):
+    capacity = args.workers * (1 if args.worker_class == "sync" else args.worker_connections)
+    rows, total = [], 0
+    for step in sorted(set(rec.samples) | set(rec.errors) - {"health"}):
+        s = rec.samples.get(step, [])
+        total += len(s)
+        rows.append({"step": step, "count": len(s), "errors": rec.errors.get(step, 0),
+                     "rps": len(s) / elapsed,
+                     "p50_ms": pct(s, 50) * 1000, "p95_ms": pct(s, 95) * 1000, "p99_ms": pct(s, 99) * 1000})
+    summary = {
+        "config": {k: v for k, v in vars(args).items() if k != "json"},
+        "elapsed_s": elapsed, "total_requests": total, "requests_per_s": total / elapsed,
+        "steps": rows,
+        "saturation": {
+            "capacity": capacity,
+            "mean_inflight": statistics.mean(rec.inflight_samples or [0]),
+            "max_inflight": max(rec.inflight_samples or [0]),
+            "mean_utilisation": statistics.mean(rec.inflight_samples or [0]) / capacity,
+            "health_p50_ms": pct(rec.health, 50) * 1000,
+            "health_p95_ms": pct(rec.health, 95) * 1000,
+        },
+        "upstream": fake.stats(),
+    }
+
+    print(f"\n{args.worker_class} x{args.workers}, {args.users} users, {elapsed:.1f}s, "
+          f"upstream latency {args.latency}s @ {args.token_rate} tok/s, stream={args.stream}")
+    print(f"{'step':<12}{'count':>7}{'err':>6}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in rows:
+        print(f"{r['step']:<12}{r['count']:>7}{r['errors']:>6}{r['rps']:>8.1f}"
+              f"{r['p50_ms']:>10.0f}{r['p95_ms']:>10.0f}{r['p99_ms']:>10.0f}")
+    sat = summary["saturation"]
+    print(f"\ntotal {total} requests, {summary['requests_per_s']:.1f} req/s")
+    print(f"in flight: mean {sat['mean_inflight']:.1f}, max {sat['max_inflight']} of capacity {capacity} "
+          f"({sat['mean_utilisation']:.0%}); /health p50 {sat['health_p50_ms']:.0f} ms, "
+          f"p95 {sat['health_p95_ms']:.0f} ms")
+    print(f"upstream: {summary['upstream']}")
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load test against a fake OpenAI API.")
+    ap.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    ap.add_argument("--duration", type=float, default=20, help="seconds of load")
+    ap.add_argument("--mix", default="pb=4,ask_help=3,teach_me=2,login=1", help="scenario weights")
+    ap.add_argument("--replies", type=int, default=2, help="/pb_reply calls per prompt-builder flow")
+    ap.add_argument("--stream", action="store_true", help="use the NDJSON streaming endpoints")
+    ap.add_argument("--worker-class", default="gevent", choices=["gevent", "sync", "gthread"])
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--worker-connections", type=int, default=500, help="for capacity maths only")
+    ap.add_argument("--latency", type=float, default=0.5, help="fake upstream time to first token")
+    ap.add_argument("--token-rate", type=float, default=50, help="fake upstream tokens/sec")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream 5xx")
+    ap.add_argument("--json", help="also write the summary to this file")
+    args = ap.parse_args()
+
+    mix = parse_mix(args.mix)
+    fake = FakeOpenAI(args.latency, args.token_rate, error_rate=args.error_rate)
+    api, api_url = serve(fake)
+    with tempfile.TemporaryDirectory() as workdir:
+        proc, base = start_app(args, api_url, workdir)
+        rec, stop = Recorder(), threading.Event()
+        deadline = time.time() + args.duration
+
+        def run_user():
+            user = User(base, rec, args.stream, args.replies)
+            user.login()
+            while time.time() < deadline:
+                getattr(user, random.choices(list(mix), weights=list(mix.values()))[0])()
+
+        threading.Thread(target=probe, args=(base, rec, stop), daemon=True).start()
+        start = time.perf_counter()
+        users = [threading.Thread(target=run_user) for _ in range(args.users)]
+        for t in users:
+            t.start()
+        for t in users:
+            t.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+    api.shutdown()
+
+    summary = report(rec, fake, args, elapsed)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Measure how quickly a fresh worker can serve traffic.
+
+    python bench/startup.py
+    python bench/startup.py --runs 10 --worker-class sync --top 15
+
+Two numbers matter when scaling workers up under load:
+
+  import      time for a fresh interpreter to import wsgi (which runs
+              create_app()), split into `import app` and create_app(), and
+              which heavy optional modules got loaded on the way
+  first /health
+              time from launching gunicorn until the first /health answers
+
+Each measurement runs in a new process, --runs times; the median and the
+best run are reported. --top lists the slowest imports (python -X importtime).
+"""
+import argparse, json, os, socket, statistics, subprocess, sys, tempfile, time, urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["openai", "httpx", "numpy", "tiktoken", "pydantic"]
+
+PROBE = f"""
+import json, sys, time
+sys.path.insert(0, {ROOT!r})
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.create_app()
+t2 = time.perf_counter()
+print(json.dumps({{"import_s": t1 - t0, "create_app_s": t2 - t1,
+                  "loaded": [m for m in {HEAVY!r} if m in sys.modules]}}))
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(env, workdir):
+    out = subprocess.run([sys.executable, "-c", PROBE], env=env, cwd=workdir,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure_first_health(args, env, workdir):
+    port = free_port()
+    env = dict(env, GUNICORN_WORKER_CLASS=args.worker_class, WEB_CONCURRENCY="1")
+    cmd = [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+           "--pythonpath", ROOT, "-b", f"127.0.0.1:{port}", "wsgi:app"]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        while time.perf_counter() - start < 30:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+                return time.perf_counter() - start
+            except OSError:
+                if proc.poll() is not None:
+                    sys.exit("gunicorn exited:\n" + proc.stderr.read().decode(errors="replace"))
+                time.sleep(0.005)
+        sys.exit("gunicorn did not answer /health within 30s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def top_imports(env, workdir, n):
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import wsgi"], env=env, cwd=workdir,
+                         capture_output=True, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def summarize(values):
+    return f"median {statistics.median(values) * 1000:7.1f} ms   best {min(values) * 1000:7.1f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Cold-start benchmark: import time and time to first /health.")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--worker-class", default="gevent", choices=["gevent", "sync", "gthread"])
+    ap.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    ap.add_argument("--json", help="also write the results to this file")
+    args = ap.parse_args()
+
+    env = dict(os.environ, SECRET_KEY="bench", APP_PASSWORD="bench", OPENAI_API_KEY="fake",
+               PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    with tempfile.TemporaryDirectory() as workdir:   # keep prompt_log/ out of the repo
+        imports = [measure_import(env, workdir) for _ in range(args.runs)]
+        health = [measure_first_health(args, env, workdir) for _ in range(args.runs)]
+        top = top_imports(env, workdir, args.top) if args.top else []
+
+    results = {
+        "runs": args.runs, "worker_class": args.worker_class,
+        "import_app_s": statistics.median(r["import_s"] for r in imports),
+        "create_app_s": statistics.median(r["create_app_s"] for r in imports),
+        "first_health_s": statistics.median(health),
+        "heavy_modules_loaded": imports[-1]["loaded"],
+    }
+    print(f"import app      {summarize([r['import_s'] for r in imports])}")
+    print(f"create_app()    {summarize([r['create_app_s'] for r in imports])}")
+    print(f"first /health   {summarize(health)}   ({args.worker_class}, 1 worker)")
+    print(f"heavy modules loaded at startup: {', '.join(results['heavy_modules_loaded']) or 'none'}")
+    if top:
+        print("\nslowest imports (cumulative):")
+        for us, name in top:
+            print(f"  {us / 1000:8.1f} ms  {name}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Gunicorn settings; `gunicorn wsgi:app` picks this file up automatically.
+
+By default workers use gevent: every request runs in a greenlet and the
+socket I/O underneath OpenAI calls and streamed replies yields to other
+requests. One worker can then hold hundreds of open conversations while
+/health and the static pages stay responsive. SQLite, flock and log file
+writes are not made cooperative by gevent; the stores and the log writer
+run them on gevent's native threadpool (app/services/blocking.py) so a
+busy database parks one request instead of the whole worker. Set
+GUNICORN_WORKER_CLASS=sync to go back to one request per worker.
+"""
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+if worker_class == "gevent":
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        print("⚠️ gevent is not installed; falling back to sync workers")
+        worker_class = "sync"
+
+workers            = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "500"))   # greenlets per worker
+timeout            = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+keepalive          = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
@@ -0,0 +1,4 @@
+import os, sys
+
+# Run from anywhere: make the `app` package importable without installing it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
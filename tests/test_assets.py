@@ -0,0 +1,19 @@
+import os
+
+from app.services import assets as assets_module
+from app.services.assets import STATIC_DIR
+
+
+def test_build_goes_under_the_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from app import create_app
+    client = create_app().test_client()
+    assert os.path.isfile(tmp_path / "prompt_log" / "assets" / "manifest.json")
+    assert not os.path.exists(os.path.join(STATIC_DIR, "dist"))
+
+    hashed = assets_module.assets.files["css/home.css"]
+    resp = client.get(f"/assets/{hashed}", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "immutable" in resp.headers["Cache-Control"]
+    resp.close()
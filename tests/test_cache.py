@@ -0,0 +1,57 @@
+import pytest
+
+from app.services import cache
+from app.services.cache import ResponseCache, cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_key_covers_everything_that_shapes_the_answer():
+    messages = [{"role": "user", "content": "Explain pivot tables"}]
+    key = cache_key("gpt-4o-mini", 0, messages)
+    assert key == cache_key("gpt-4o-mini", 0, [dict(m) for m in messages])
+    assert key != cache_key("gpt-4o", 0, messages)
+    assert key != cache_key("gpt-4o-mini", 0.7, messages)
+    assert key != cache_key("gpt-4o-mini", 0, [{"role": "user", "content": "Explain charts"}])
+
+
+def test_hit_miss_and_ttl(clock):
+    c = ResponseCache(size=10, ttl=60, path="")
+    assert c.get("k") is None
+    c.set("k", "answer")
+    assert c.get("k") == "answer"
+    clock.now += 61
+    assert c.get("k") is None
+    assert c.stats() == {"hits": 1, "misses": 2, "entries": 0}
+
+
+def test_lru_is_bounded(clock):
+    c = ResponseCache(size=2, ttl=60, path="")
+    c.set("a", "1")
+    c.set("b", "2")
+    c.get("a")
+    c.set("c", "3")
+    assert c.get("b") is None
+    assert c.get("a") == "1" and c.get("c") == "3"
+
+
+def test_sqlite_backend_is_shared(tmp_path, clock):
+    path = str(tmp_path / "ai_cache.db")
+    ResponseCache(ttl=60, path=path).set("k", "answer")
+    other = ResponseCache(ttl=60, path=path)   # another worker
+    assert other.get("k") == "answer"
+    clock.now += 61
+    assert ResponseCache(ttl=60, path=path).get("k") is None
@@ -0,0 +1,70 @@
+import pytest
+
+from app.services import context
+from app.services.context import fit_context, message_tokens
+from app.services.convo_store import MemoryStore
+
+SYSTEM = {"role": "system", "content": "You build Copilot prompts."}
+
+
+def turns(n, words=60):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "detail " * words}
+            for i in range(n)]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryStore()
+    monkeypatch.setattr(context, "get_store", lambda: store)
+    monkeypatch.setattr(context, "PB_CONTEXT_TRIM", True)
+    monkeypatch.setattr(context, "PB_CONTEXT_BUDGET", 300)
+    monkeypatch.setattr(context, "PB_KEEP_TURNS", 2)
+    return store
+
+
+def _conversation(store, messages):
+    store.reset("c1", messages)
+    return messages
+
+
+def test_off_by_default(monkeypatch):
+    monkeypatch.setattr(context, "PB_CONTEXT_TRIM", False)
+    messages = [SYSTEM] + turns(10)
+    assert fit_context("c1", messages, None) == (messages, None)
+
+
+def test_short_conversation_is_sent_as_is(store):
+    messages = _conversation(store, [SYSTEM] + turns(2, words=5))
+    view, report = fit_context("c1", messages, lambda m: pytest.fail("should not summarize"))
+    assert view == messages
+    assert report["tokens_saved"] == 0
+
+
+def test_old_turns_are_folded_into_a_stored_summary(store):
+    messages = _conversation(store, [SYSTEM] + turns(8))
+    requests = []
+
+    def chat(request):
+        requests.append(request)
+        return "User wants a Word memo for the team."
+
+    view, report = fit_context("c1", messages, chat)
+    assert len(requests) == 1
+    assert "turn 0" in requests[0][-1]["content"] and "turn 6" not in requests[0][-1]["content"]
+    assert view[0] == SYSTEM
+    assert "User wants a Word memo" in view[1]["content"]
+    assert view[2:] == messages[-2:]
+    assert store.get_summary("c1") == ("User wants a Word memo for the team.", 6)
+    assert report["tokens_after"] == message_tokens(view) < report["tokens_before"]
+
+    # The next turn reuses the stored summary while the view fits the budget.
+    messages = messages + turns(1, words=5)
+    view, _ = fit_context("c1", messages, lambda m: pytest.fail("under budget, nothing to fold"))
+    assert view[2:] == messages[-3:]
+
+
+def test_summary_larger_than_the_turns_is_not_sent(store):
+    messages = _conversation(store, [SYSTEM] + turns(8))
+    view, report = fit_context("c1", messages, lambda m: "summary " * 2000)
+    assert view == messages
+    assert report["tokens_saved"] == 0
@@ -0,0 +1,101 @@
+import sqlite3, time
+
+import pytest
+
+from app.services import convo_store
+from app.services.convo_store import MemoryStore, SqliteStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(convo_store, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, clock):
+    if request.param == "memory":
+        return MemoryStore(ttl=60)
+    return SqliteStore(path=str(tmp_path / "convos.db"), ttl=60)
+
+
+def msg(role, content):
+    return {"role": role, "content": content}
+
+
+def test_appended_turns_come_back_in_order(store):
+    store.append("c1", msg("system", "s"))
+    store.append("c1", msg("user", "u"), msg("assistant", "a"))
+    assert store.get("c1") == [msg("system", "s"), msg("user", "u"), msg("assistant", "a")]
+    assert store.get("other") == []
+
+
+def test_reset_replaces_the_conversation(store):
+    store.append("c1", msg("user", "old"))
+    store.reset("c1", [msg("system", "new")])
+    assert store.get("c1") == [msg("system", "new")]
+
+
+def test_delete(store):
+    store.append("c1", msg("user", "u"))
+    store.delete("c1")
+    assert store.get("c1") == []
+
+
+def test_idle_conversation_expires(store, clock):
+    store.append("c1", msg("user", "u"))
+    clock.now += 61
+    assert store.get("c1") == []
+    store.append("c1", msg("user", "again"))   # starts over rather than resurrecting the old turns
+    assert store.get("c1") == [msg("user", "again")]
+
+
+def test_memory_store_evicts_least_recently_used(clock):
+    store = MemoryStore(max_convos=2, ttl=60)
+    store.append("a", msg("user", "a"))
+    store.append("b", msg("user", "b"))
+    store.get("a")
+    store.append("c", msg("user", "c"))
+    assert store.get("b") == []
+    assert store.get("a") and store.get("c")
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path, clock):
+    path = str(tmp_path / "convos.db")
+    SqliteStore(path=path, ttl=60).append("c1", msg("user", "u"))
+    assert SqliteStore(path=path, ttl=60).get("c1") == [msg("user", "u")]
+
+
+def test_sqlite_store_purges_expired_conversations(tmp_path, clock):
+    path = str(tmp_path / "convos.db")
+    store = SqliteStore(path=path, ttl=60)
+    store.append("old", msg("user", "u"))
+    clock.now += 400
+    store.append("new", msg("user", "v"))
+    rows = sqlite3.connect(path).execute("SELECT DISTINCT cid FROM messages").fetchall()
+    assert rows == [("new",)]
+
+
+def test_sqlite_reads_do_not_wait_for_a_writer(tmp_path, clock):
+    path = str(tmp_path / "convos.db")
+    store = SqliteStore(path=path, ttl=60)
+    store.append("c1", msg("user", "u"))
+    store.set_summary("c1", "summary", 1)
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")   # another worker mid-append
+    try:
+        start = time.monotonic()
+        assert store.get("c1") == [msg("user", "u")]
+        assert store.get_summary("c1") == ("summary", 1)
+        assert time.monotonic() - start < 1
+    finally:
+        writer.rollback()
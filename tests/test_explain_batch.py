@@ -0,0 +1,77 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import ai
+from app.services.cache import ResponseCache
+from app.services.openai_client import UpstreamUnavailable
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Stand-in for the model: records each request and answers it with reply(prompt)."""
+    fake = SimpleNamespace(calls=[], reply=None)
+
+    def complete(messages, model, temperature=None, **kwargs):
+        fake.calls.append(messages)
+        return fake.reply(messages[-1]["content"])
+
+    monkeypatch.setattr(ai, "complete", complete)
+    monkeypatch.setattr(ai, "response_cache", ResponseCache(path=""))
+    return fake
+
+
+def _packed(*explanations):
+    return json.dumps({"explanations": list(explanations)})
+
+
+def test_one_packed_call_answers_the_batch(upstream):
+    upstream.reply = lambda prompt: _packed("Audience sets the tone.", "Length sets the detail.")
+    items = [("Who is the audience?", "Word"), ("How long should it be?", "Word")]
+    assert ai.explain_questions_batch(items) == [
+        {"explanation": "Audience sets the tone."}, {"explanation": "Length sets the detail."}]
+    assert len(upstream.calls) == 1
+
+    # Each answer was cached under its single-question key.
+    assert ai.explain_questions_batch(items[1:]) == [{"explanation": "Length sets the detail."}]
+    assert len(upstream.calls) == 1
+
+
+def test_failed_questions_get_their_own_error(upstream):
+    def reply(prompt):
+        if prompt.startswith("1. "):
+            return _packed("only one")   # does not match the three questions: fan out
+        if "Which file?" in prompt:
+            raise UpstreamUnavailable("The AI service is busy.")
+        return "Explained: " + prompt.split("explain: ")[1].split("\n")[0]
+
+    upstream.reply = reply
+    results = ai.explain_questions_batch([("Who is it for?", "Word"), ("Which file?", "Word"),
+                                          ("   ", "Word"), ("What tone?", "Outlook")])
+    assert results == [
+        {"explanation": "Explained: Who is it for?"},
+        {"error": "The AI service is busy."},
+        {"error": "No question provided to explain."},
+        {"explanation": "Explained: What tone?"},
+    ]
+
+
+def test_route(upstream, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)   # the app writes its logs and databases under the cwd
+    from app import create_app
+    client = create_app().test_client()
+    body = {"app_context": "Excel", "questions": ["Which sheet?", {"question_text": "Which chart?",
+                                                                   "app_context": "PowerPoint"}]}
+    assert client.post("/followups/explain_batch", json=body).status_code == 403
+
+    with client.session_transaction() as sess:
+        sess["logged_in"] = True
+    upstream.reply = lambda prompt: _packed("Sheets hold the data.", "Charts differ.")
+    resp = client.post("/followups/explain_batch", json=body)
+    assert resp.status_code == 200
+    assert [r["question_text"] for r in resp.get_json()["results"]] == ["Which sheet?", "Which chart?"]
+    assert "App context: PowerPoint" in upstream.calls[-1][-1]["content"]
+    assert client.post("/followups/explain_batch", json={"questions": []}).status_code == 400
+    assert client.post("/followups/explain_batch",
+                       json={"questions": ["q"] * (ai.EXPLAIN_BATCH_MAX + 1)}).status_code == 400
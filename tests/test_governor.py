@@ -0,0 +1,116 @@
+import threading, time
+
+import pytest
+
+from app.services import governor as g
+from app.services.governor import Governor, UpstreamBusy
+
+
+def _wait_queued(gov, n, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(gov._queue) < n:
+        assert time.monotonic() < deadline, "calls never queued"
+        time.sleep(0.005)
+
+
+def test_queued_calls_start_in_priority_order():
+    gov = Governor(concurrency=1)
+    started = []
+
+    def call(site):
+        with gov.slot(site):
+            started.append(site)
+
+    with gov.slot("clarify"):
+        threads = []
+        for site in ["explain", "clarify", "finalize"]:   # arrive lowest priority first
+            threads.append(threading.Thread(target=call, args=(site,)))
+            threads[-1].start()
+            _wait_queued(gov, len(threads))
+    for t in threads:
+        t.join(5)
+    assert started == ["finalize", "clarify", "explain"]
+
+
+def test_sheds_when_predicted_wait_exceeds_timeout(monkeypatch):
+    monkeypatch.setattr(g, "AI_SLOT_TIMEOUT", 1)
+    gov = Governor(concurrency=1)
+    gov._call_seconds = 4.2
+    with gov.slot("clarify"):
+        with pytest.raises(UpstreamBusy) as exc:
+            with gov.slot("clarify"):
+                pass
+    assert exc.value.retry_after == 5   # one call ahead of it, rounded up
+    assert "retry in 5 s" in exc.value.message
+    assert gov._queue == []
+
+
+def test_speculative_calls_shed_at_their_own_wait():
+    gov = Governor(concurrency=1)
+    gov._call_seconds = 2.5
+    with gov.slot("clarify"):
+        with gov.speculative(max_wait=2):
+            with pytest.raises(UpstreamBusy) as exc:
+                with gov.slot("explain"):
+                    pass
+    assert exc.value.retry_after == 3
+    assert gov._queue == []
+
+
+def test_sheds_after_waiting_out_the_timeout(monkeypatch):
+    monkeypatch.setattr(g, "AI_SLOT_TIMEOUT", 0.2)
+    gov = Governor(concurrency=1)
+    gov._call_seconds = 0.1   # predicted to fit, but the slot is never freed
+    with gov.slot("clarify"):
+        start = time.monotonic()
+        with pytest.raises(UpstreamBusy) as exc:
+            with gov.slot("clarify"):
+                pass
+        assert time.monotonic() - start >= 0.2
+    assert exc.value.retry_after == 1
+    assert gov._queue == [] and gov.inflight == 0
+
+
+def test_rpm_budget_spaces_calls_out():
+    gov = Governor(concurrency=10, rpm=600, processes=1)   # one request every 0.1 s
+    gov.requests.level = 0
+    starts = []
+    for _ in range(4):
+        with gov.slot("clarify") as ticket:
+            starts.append(ticket.started)
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert all(0.08 <= gap < 0.3 for gap in gaps), gaps
+
+
+def test_rpm_budget_is_split_across_processes():
+    gov = Governor(rpm=600, processes=4)
+    assert gov.requests.capacity == 150
+    assert Governor(rpm=0).requests.wait_time(1, time.monotonic()) == 0.0
+
+
+def test_session_queue_cap_applies_to_pool_work(monkeypatch):
+    monkeypatch.setattr(g, "AI_SESSION_MAX_QUEUED", 1)
+    gov = Governor(concurrency=1)
+    done = []
+
+    def pool_work(key):   # a pool thread: no request context, only the key it was handed
+        with gov.acting_for(key):
+            with gov.slot("explain"):
+                done.append(key)
+
+    with gov.slot("clarify"):
+        waiting = threading.Thread(target=pool_work, args=("alice",))
+        waiting.start()
+        _wait_queued(gov, 1)
+        assert gov._queue[0].session == "alice"
+        with pytest.raises(UpstreamBusy):
+            pool_work("alice")
+        with pytest.raises(UpstreamBusy):
+            with gov.slot("explain", session_key="alice"):
+                pass
+        other = threading.Thread(target=pool_work, args=("bob",))   # another session still queues
+        other.start()
+        _wait_queued(gov, 2)
+    waiting.join(5)
+    other.join(5)
+    assert sorted(done) == ["alice", "bob"]
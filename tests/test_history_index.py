@@ -0,0 +1,157 @@
+import csv, gzip, os, sqlite3, time
+
+import pytest
+
+from app.services import history_index
+from app.services.history_index import HistoryIndex, index_log
+from app.services.log_writer import get_writer
+
+HEADER = ["timestamp", "app", "task", "prompt", "manual_summary"]
+ROWS = [
+    ["2024-03-01T09:00:00", "Word", "Write a memo", "Draft a memo about the offsite", "Open Word"],
+    ["2024-03-02T10:00:00", "Excel", "Build a pivot table", "Summarize sales by region", "Insert > PivotTable"],
+    ["2024-03-03T11:00:00", "word", "Rewrite a letter", "Make this letter friendlier", "Select the text"],
+]
+
+
+def _write(path, rows, header=None, mode="w"):
+    with open(path, mode, newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        if header:
+            w.writerow(header)
+        w.writerows(rows)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return HistoryIndex(path=str(tmp_path / "history.db"))
+
+
+@pytest.fixture
+def history_csv(tmp_path, index):
+    path = str(tmp_path / "history.csv")
+    _write(path, ROWS, HEADER)
+    assert index.import_csv(path) == 3
+    return path
+
+
+def _tasks(result):
+    return [item["task"] for item in result["items"]]
+
+
+def test_word_search_with_prefix(index, history_csv):
+    assert _tasks(index.search(q="pivot")) == ["Build a pivot table"]
+    assert _tasks(index.search(q="memo off")) == ["Write a memo"]   # last word is a prefix
+    assert index.search(q='"unbalanced quote AND')["items"] == []
+
+
+def test_filters_by_app_and_date(index, history_csv):
+    assert _tasks(index.search(app="WORD")) == ["Rewrite a letter", "Write a memo"]
+    assert _tasks(index.search(since="2024-03-02")) == ["Rewrite a letter", "Build a pivot table"]
+    assert _tasks(index.search(until="2024-03-02")) == ["Build a pivot table", "Write a memo"]
+
+
+def test_pages(index, history_csv):
+    first = index.search(per_page=2)
+    second = index.search(per_page=2, page=2)
+    assert first["has_more"] and not second["has_more"]
+    assert _tasks(first) + _tasks(second) == ["Rewrite a letter", "Build a pivot table", "Write a memo"]
+
+
+def test_get_and_stats(index, history_csv):
+    item = index.search(q="pivot")["items"][0]
+    assert index.get(item["id"]) == item
+    assert index.get(12345) is None
+    stats = index.stats()
+    assert stats["prompts"] == 3
+    assert {app.lower(): n for app, n in stats["apps"].items()} == {"excel": 1, "word": 2}
+
+
+def test_imports_only_what_was_appended(index, history_csv):
+    assert index.import_csv(history_csv) == 0
+    _write(history_csv, [["2024-03-04T08:00:00", "Teams", "Plan a meeting", "Agenda", "Open Teams"]], mode="a")
+    with open(history_csv, "a", encoding="utf-8") as f:
+        f.write("2024-03-05T08:00:00,Outlook,half a row")   # still being written
+    assert index.import_csv(history_csv) == 1
+    with open(history_csv, "a", encoding="utf-8") as f:
+        f.write(",Reply to all,Open Outlook\n")
+    assert index.import_csv(history_csv) == 1
+    assert index.stats()["prompts"] == 5
+
+
+def test_plain_prompt_log_columns(index, tmp_path):
+    path = str(tmp_path / "prompts.csv")
+    _write(path, [["Summarize a thread", "Summarize this email thread", "1. Open Outlook"]])
+    assert index.import_csv(path) == 1
+    item = index.search(q="thread")["items"][0]
+    assert (item["task"], item["prompt"], item["manual"]) == \
+        ("Summarize a thread", "Summarize this email thread", "1. Open Outlook")
+    assert item["app"] == ""
+
+
+def test_plain_prompt_log_rows_with_the_app(index, tmp_path):
+    path = str(tmp_path / "prompts.csv")
+    _write(path, [["Summarize a thread", "Summarize this email thread", "1. Open Outlook"],
+                  ["Write a memo", "Draft a memo", "1. Open Word", "Word"]])
+    assert index.import_csv(path) == 2
+    assert index.search(q="memo")["items"][0]["app"] == "Word"
+    assert index.stats()["apps"] == {"": 1, "Word": 1}
+
+
+def _ts(index, task):
+    return index.search(q=task)["items"][0]["timestamp"]
+
+
+def test_only_rows_past_stamp_from_are_stamped(index, tmp_path):
+    path = str(tmp_path / "prompts.csv")
+    _write(path, [["Old task", "from before indexing", "steps"]])
+    start = os.path.getsize(path)
+    _write(path, [["New task", "written just now", "steps"]], mode="a")
+    assert index.import_csv(path, stamp_from=start) == 2
+    assert _ts(index, "Old") is None
+    assert _ts(index, "New").startswith("20")
+
+
+def test_rows_logged_through_the_writer_are_dated_from_the_first_batch(index, tmp_path, monkeypatch):
+    monkeypatch.setattr(history_index, "_index", index)
+    path = str(tmp_path / "history.csv")
+    _write(path, [ROWS[0][2:]], ["task", "prompt", "manual_summary"])   # backfill, no timestamps
+    writer = get_writer(path, header=["task", "prompt", "manual_summary"], on_batch=index_log)
+    writer.write({"task": "Fresh memo", "prompt": "Draft a memo", "manual_summary": "Open Word"})
+    writer.flush()
+    writer.write({"task": "Fresh chart", "prompt": "Chart sales", "manual_summary": "Insert chart"})
+    writer.flush()
+    today = time.strftime("%Y-%m-%d", time.gmtime())
+    assert sorted(_tasks(index.search(since=today))) == ["Fresh chart", "Fresh memo"]
+    assert _ts(index, "Write") is None
+
+
+def test_archive_skips_rows_already_indexed_from_the_live_file(index, tmp_path):
+    live = str(tmp_path / "prompts.csv")
+    rows = [["Task A", "prompt a", "steps"], ["Task B", "prompt b", "steps"]]
+    _write(live, rows)
+    assert index.import_csv(live) == 2
+    archive = str(tmp_path / "prompts-20240101-120000.csv.gz")
+    with gzip.open(archive, "wt", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows + [["Task C", "prompt c", "steps"]])   # C was never seen live
+    assert index.import_csv(archive) == 1
+    assert index.import_csv(archive) == 0
+    other = str(tmp_path / "other-20240101-120000.csv.gz")
+    with gzip.open(other, "wt", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows[:1])
+    assert index.import_csv(other) == 1
+    assert index.stats()["prompts"] == 4
+
+
+def test_reads_do_not_wait_for_a_writer(index, history_csv):
+    writer = sqlite3.connect(index.path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")   # another worker mid-import
+    try:
+        start = time.monotonic()
+        assert len(index.search(q="memo")["items"]) == 1
+        assert index.get(1)["task"] == "Write a memo"
+        assert index.stats()["prompts"] == 3
+        assert index.import_csv(history_csv) == 0   # nothing new, so no write
+        assert time.monotonic() - start < 1
+    finally:
+        writer.rollback()
@@ -0,0 +1,91 @@
+import time
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from app.services import openai_client
+from app.services.openai_client import CircuitBreaker, UpstreamUnavailable, call_openai
+
+
+class ConnectionFailed(openai.APIConnectionError):
+    def __init__(self):
+        Exception.__init__(self, "connection reset")
+
+
+class StatusError(openai.APIStatusError):
+    def __init__(self, status, retry_after=None):
+        Exception.__init__(self, f"HTTP {status}")
+        self.status_code = status
+        self.response = SimpleNamespace(headers={"retry-after": retry_after} if retry_after else {})
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    monkeypatch.setattr(openai_client, "breaker", breaker)
+    monkeypatch.setattr(openai_client, "get_client", lambda: "client")
+    monkeypatch.setattr(openai_client, "OPENAI_MAX_RETRIES", 2)
+    monkeypatch.setattr(openai_client, "_backoff", lambda attempt, e: 0)
+    return breaker
+
+
+def _failing(*errors, result="ok"):
+    errors = list(errors)
+    calls = []
+
+    def fn(client):
+        calls.append(client)
+        if errors:
+            raise errors.pop(0)
+        return result
+    return fn, calls
+
+
+def test_retries_transient_failures(breaker):
+    fn, calls = _failing(ConnectionFailed(), StatusError(429))
+    assert call_openai(fn) == "ok"
+    assert len(calls) == 3
+    assert breaker.state == "closed"
+
+
+def test_gives_up_after_retries_and_opens_the_breaker(breaker):
+    for _ in range(2):
+        fn, calls = _failing(*[StatusError(503)] * 3)
+        with pytest.raises(UpstreamUnavailable):
+            call_openai(fn)
+        assert len(calls) == 3
+    assert breaker.state == "open"
+    fn, calls = _failing()
+    with pytest.raises(UpstreamUnavailable):   # fails fast while open
+        call_openai(fn)
+    assert calls == []
+
+
+def test_client_errors_are_not_retried(breaker):
+    fn, calls = _failing(StatusError(400))
+    with pytest.raises(StatusError):
+        call_openai(fn)
+    assert len(calls) == 1
+    assert breaker.failures == 0
+
+
+def test_backoff_honours_retry_after():
+    assert openai_client._backoff(0, StatusError(429, retry_after="3")) == 3.0
+    assert openai_client._backoff(0, StatusError(429, retry_after="120")) == 10.0
+    assert 0 <= openai_client._backoff(1, ConnectionFailed()) <= 1.0
+
+
+def test_breaker_lets_one_trial_through_after_the_cooldown():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    breaker.before_call()                      # the trial call
+    with pytest.raises(UpstreamUnavailable):   # nobody else while it runs
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
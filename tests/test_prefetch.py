@@ -0,0 +1,51 @@
+import threading
+
+from app.services.prefetch import Prefetcher
+
+
+def test_prefetched_answer_is_taken_once():
+    p = Prefetcher(enabled=True, workers=2, max_inflight=4, ttl=60)
+    calls = []
+    assert p.submit("c1", "Who is the audience?", lambda: calls.append(1) or "Because tone matters")
+    assert not p.submit("c1", "Who is the audience?", lambda: calls.append(1))   # already running
+    assert p.take("c1", "Who is the audience? ") == "Because tone matters"
+    assert p.take("c1", "Who is the audience?") is None
+    assert calls == [1]
+
+
+def test_take_joins_a_call_still_in_flight():
+    p = Prefetcher(enabled=True, workers=1, max_inflight=4, ttl=60)
+    release = threading.Event()
+    p.submit("c1", "q", lambda: release.wait(5) and "answer")
+    threading.Timer(0.05, release.set).start()
+    assert p.take("c1", "q") == "answer"
+
+
+def test_only_the_latest_question_is_kept():
+    p = Prefetcher(enabled=True, workers=1, max_inflight=4, ttl=60)
+    p.submit("c1", "first", lambda: "one")
+    p.submit("c1", "second", lambda: "two")
+    assert p.take("c1", "first") is None
+    assert p.take("c1", "second") == "two"
+
+
+def test_skips_instead_of_queueing_beyond_the_cap():
+    p = Prefetcher(enabled=True, workers=1, max_inflight=1, ttl=60)
+    release = threading.Event()
+    assert p.submit("c1", "q", lambda: release.wait(5))
+    assert not p.submit("c2", "q", lambda: "never")
+    release.set()
+    assert p.take("c2", "q") is None
+
+
+def test_failures_fall_back_to_a_normal_call():
+    p = Prefetcher(enabled=True, workers=1, max_inflight=1, ttl=60)
+    p.submit("c1", "q", lambda: 1 / 0)
+    assert p.take("c1", "q") is None
+    assert p.submit("c2", "q", lambda: "slot was released")
+
+
+def test_disabled_is_a_no_op():
+    p = Prefetcher(enabled=False)
+    assert not p.submit("c1", "q", lambda: "x")
+    assert p.take("c1", "q") is None
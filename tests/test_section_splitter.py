@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from app.helpers import COPILOT_MARKER, MANUAL_MARKER, SectionSplitter
+
+FINAL = f"Here you go.\n{COPILOT_MARKER}\nDraft a memo == to the team.\n{MANUAL_MARKER}\n1. Open Word ===\n"
+EXPECTED = {
+    "reply": "Here you go.\n",
+    "copilot": "\nDraft a memo == to the team.\n",
+    "manual": "\n1. Open Word ===\n",
+}
+
+
+def _split(chunks, section="reply"):
+    splitter = SectionSplitter(section)
+    events = []
+    for chunk in chunks:
+        events += splitter.feed(chunk)
+    events += splitter.flush()
+    out = {}
+    for sec, text in events:
+        assert text, "empty deltas should not be emitted"
+        out[sec] = out.get(sec, "") + text
+    return out
+
+
+def test_whole_reply():
+    assert _split([FINAL]) == EXPECTED
+
+
+@pytest.mark.parametrize("cut", range(1, len(FINAL)))
+def test_markers_split_at_any_boundary(cut):
+    assert _split([FINAL[:cut], FINAL[cut:]]) == EXPECTED
+
+
+def test_one_character_at_a_time():
+    assert _split(list(FINAL)) == EXPECTED
+
+
+def test_random_chunking():
+    rng = random.Random(7)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(FINAL)), rng.randint(1, 12)))
+        chunks = [FINAL[a:b] for a, b in zip([0] + cuts, cuts + [len(FINAL)])]
+        assert _split(chunks) == EXPECTED
+
+
+def test_partial_marker_is_held_back_until_settled():
+    splitter = SectionSplitter()
+    assert splitter.feed("Question?\n===COPI") == [("reply", "Question?\n")]
+    assert splitter.feed("ed text") == [("reply", "===COPIed text")]
+
+
+def test_finalize_stream_starts_in_copilot():
+    text = f"{COPILOT_MARKER}\nPrompt\n{MANUAL_MARKER}\nSteps"
+    assert _split([text[:25], text[25:]], "copilot") == {"copilot": "\nPrompt\n", "manual": "\nSteps"}
+    assert _split(["Prompt only"], "copilot") == {"copilot": "Prompt only"}
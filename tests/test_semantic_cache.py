@@ -0,0 +1,48 @@
+import pytest
+
+from app.services import semantic_cache
+from app.services.semantic_cache import SemanticCache
+
+pytest.importorskip("numpy")
+
+PROBLEM = "Outlook keeps crashing when I open attachments"
+STEPS = ["1. Start Outlook in safe mode", "2. Disable add-ins"]
+
+
+def _cache(threshold=0.8, path=""):
+    cache = SemanticCache(threshold=threshold, path=path)
+    cache.add("Outlook", PROBLEM, STEPS)
+    return cache
+
+
+def test_rewording_reuses_the_answer():
+    steps, sim = _cache().lookup("outlook", "Outlook crashes when opening an attachment")
+    assert steps == STEPS and sim >= 0.8
+
+
+def test_below_threshold_is_a_miss():
+    cache = _cache()
+    steps, sim = cache.lookup("Outlook", "attachments crash outlook")   # same words, different order
+    assert steps is None and 0.5 < sim < 0.8
+    assert cache.lookup("Outlook", "my calendar invites are missing")[0] is None
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 2
+
+
+def test_threshold_is_configurable():
+    assert _cache(threshold=0.5).lookup("Outlook", "attachments crash outlook")[0] == STEPS
+
+
+def test_answers_are_per_app():
+    assert _cache().lookup("Word", PROBLEM) == (None, 0.0)
+
+
+def test_expired_answers_are_not_reused(monkeypatch):
+    cache = _cache()
+    monkeypatch.setattr(semantic_cache, "ASK_HELP_REUSE_TTL", -1)
+    assert cache.lookup("Outlook", PROBLEM)[0] is None
+
+
+def test_sqlite_shares_answers_between_workers(tmp_path):
+    path = str(tmp_path / "ask_help.db")
+    _cache(path=path)
+    assert SemanticCache(threshold=0.8, path=path).lookup("Outlook", PROBLEM)[0] == STEPS
@@ -0,0 +1,66 @@
+import threading, time
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+def _concurrently(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads = _concurrently(5, lambda: results.append(flight.do("k", slow)))
+    while flight.stats()["leaders"] + flight.stats()["collapsed"] < 5:
+        time.sleep(0.005)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert calls == [1]
+    assert results == ["answer"] * 5
+    assert flight.stats() == {"leaders": 1, "collapsed": 4, "inflight": 0}
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        release.wait(5)
+        raise ValueError("upstream said no")
+
+    def call():
+        try:
+            flight.do("k", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = _concurrently(3, call)
+    while flight.stats()["leaders"] + flight.stats()["collapsed"] < 3:
+        time.sleep(0.005)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert errors == ["upstream said no"] * 3
+
+
+def test_later_calls_run_again():
+    flight = SingleFlight()
+    assert flight.do("k", lambda: 1) == 1
+    assert flight.do("k", lambda: 2) == 2
+    with pytest.raises(KeyError):
+        flight.do("k", lambda: {}["missing"])
+    assert flight.stats()["inflight"] == 0